@@ -9,13 +9,20 @@ from cloud_provider.aws.aws_minion_manager import AWSMinionManager
 class Broker(object):
     """ Create and return cloud provider specific objects """
 
+    # Dispatch table of supported providers. Lookups are a single dict
+    # probe; new providers only need an entry here.
+    _PROVIDER_IMPLS = {
+        "aws": AWSMinionManager,
+    }
+
     @staticmethod
     def get_impl_object(provider, cluster_name, region, refresh_interval_seconds=300, **kwargs):
         """
         Given a cloud provider name, return the cloud provider specific
         implementation.
         """
-        if provider.lower() == "aws":
-            return AWSMinionManager(cluster_name, region, refresh_interval_seconds, **kwargs)
+        impl_class = Broker._PROVIDER_IMPLS.get(provider.lower())
+        if impl_class is None:
+            raise NotImplementedError
 
-        raise NotImplementedError
+        return impl_class(cluster_name, region, refresh_interval_seconds, **kwargs)
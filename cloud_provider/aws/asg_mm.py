@@ -1,11 +1,280 @@
 """ Metadata for each Autoscaling group in AWS. """
+
+import base64
+import re
+import time
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from concurrent.futures import Future
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from bunch import bunchify
+from retrying import retry
+
 MINION_MANAGER_LABEL = 'k8s-minion-manager'
 NOT_TERMINATE_LABEL = 'k8s-minion-manager/not-terminate'
 
+# EC2 instance state that counts as "running", precomputed for the hot
+# is_instance_running check.
+_RUNNING_STATE = 'running'
+
+
+class TTLCache(object):
+    """
+    A small process-wide TTL cache for AWS Describe* responses. Entries are
+    keyed by (api_name, tuple(args)) and expire after 'ttl_seconds'. This
+    keeps rapid successive calls during reconcile loops in memory instead of
+    hammering the AWS control plane.
+    """
+
+    def __init__(self, ttl_seconds=30):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Returns the cached value for 'key', or None if absent/expired. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiry, value = entry
+            if time.time() >= expiry:
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        """ Caches 'value' under 'key' for the next ttl_seconds. """
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+
+    def invalidate(self, name=None):
+        """
+        Drops entries whose args contain 'name'. Drops everything if no
+        name is given.
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if name in k[1]]:
+                del self._entries[key]
+
+
+# Cache shared by all AWS Describe* helpers in this package.
+DESCRIBE_CACHE = TTLCache()
+
+
+_BOTO3_CLIENT_CACHE = {}
+_BOTO3_CLIENT_LOCK = threading.Lock()
+
+# Shared clients are hit from many worker threads at once. botocore's
+# default urllib3 pool of 10 connections makes bursts discard and
+# re-open connections ("Connection pool is full" stalls), so size the
+# pool for the worst-case thread count and let botocore retry as well.
+_BOTO3_CLIENT_CONFIG = Config(max_pool_connections=64,
+                              retries={'max_attempts': 5})
+
+
+def shared_boto3_client(service, region, profile=None):
+    """
+    Returns a process-wide cached boto3 client for the given (service,
+    region, profile). boto3 re-parses the service model on every client
+    construction, so sharing one client per service avoids that cost and
+    keeps a single connection pool.
+    """
+    key = (service, region, profile)
+    with _BOTO3_CLIENT_LOCK:
+        client = _BOTO3_CLIENT_CACHE.get(key)
+        if client is None:
+            if profile:
+                session = boto3.Session(region_name=region,
+                                        profile_name=profile)
+            else:
+                session = boto3.Session(region_name=region)
+            client = session.client(service, config=_BOTO3_CLIENT_CONFIG)
+            _BOTO3_CLIENT_CACHE[key] = client
+        return client
+
+
+class InstanceDescribeBatcher(object):
+    """
+    Coalesces describe_instances lookups issued within a short window
+    into one batched API call. Callers hand in an instance-id and get a
+    Future that resolves to the raw instance record (or None if EC2 no
+    longer knows the id). With N callers inside the window this costs
+    ceil(N/1000) API calls instead of N.
+    """
+
+    # Matches the instance-ids embedded in EC2's
+    # InvalidInstanceID.NotFound message, so the offending ids can be
+    # dropped from a retried batch.
+    _NOT_FOUND_RE = re.compile(r'i-[0-9a-f]+')
+
+    def __init__(self, ec2_client, max_delay=0.3, max_batch=200):
+        self._ec2_client = ec2_client
+        self._max_delay = max_delay
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop)
+        self._dispatcher.daemon = True
+        self._dispatcher.start()
+
+    def describe(self, instance_id):
+        """ Returns a Future resolving to the instance record. """
+        future = Future()
+        self._queue.put((instance_id, future))
+        return future
+
+    def _dispatch_loop(self):
+        while True:
+            # Block for the first request, then keep draining until the
+            # window closes or the batch is full.
+            pending = [self._queue.get()]
+            deadline = time.time() + self._max_delay
+            while len(pending) < self._max_batch:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._dispatch(pending)
+
+    def _describe_chunk(self, chunk, instance_map):
+        """
+        Describes one chunk of instance-ids into instance_map. EC2 fails
+        the whole call with InvalidInstanceID.NotFound when any single id
+        is unknown; drop the ids named in the error and retry with the
+        rest so one stale id doesn't fail every coalesced caller. Dropped
+        ids simply stay absent from instance_map, resolving their Futures
+        to None.
+        """
+        while chunk:
+            try:
+                response = self._ec2_client.describe_instances(
+                    InstanceIds=chunk)
+            except ClientError as ex:
+                if ex.response.get('Error', {}).get('Code') != \
+                        'InvalidInstanceID.NotFound':
+                    raise
+                bad_ids = set(self._NOT_FOUND_RE.findall(str(ex))) & \
+                    set(chunk)
+                if not bad_ids:
+                    raise
+                chunk = [i for i in chunk if i not in bad_ids]
+                continue
+            for resv in response['Reservations']:
+                for instance in resv['Instances']:
+                    instance_map[instance['InstanceId']] = instance
+            return
+
+    def _dispatch(self, pending):
+        instance_ids = [instance_id for instance_id, _ in pending]
+        try:
+            instance_map = {}
+            for start in range(0, len(instance_ids), 1000):
+                self._describe_chunk(instance_ids[start:start + 1000],
+                                     instance_map)
+            for instance_id, future in pending:
+                future.set_result(instance_map.get(instance_id))
+        except Exception as ex:
+            for _, future in pending:
+                future.set_exception(ex)
+
+
+class SpotRequestBatcher(object):
+    """
+    Same coalescing idea as InstanceDescribeBatcher, for spot-instance
+    requests: lookups arriving within the window are answered by one
+    describe_spot_instance_requests call, and each caller's Future
+    resolves to its raw request record (or None if unknown).
+    """
+
+    # Matches the request-ids embedded in EC2's
+    # InvalidSpotInstanceRequestID.NotFound message.
+    _NOT_FOUND_RE = re.compile(r'sir-[0-9a-z]+')
+
+    def __init__(self, ec2_client, max_delay=0.3, max_batch=100):
+        self._ec2_client = ec2_client
+        self._max_delay = max_delay
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop)
+        self._dispatcher.daemon = True
+        self._dispatcher.start()
+
+    def describe(self, request_id):
+        """ Returns a Future resolving to the spot-request record. """
+        future = Future()
+        self._queue.put((request_id, future))
+        return future
+
+    def _dispatch_loop(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.time() + self._max_delay
+            while len(pending) < self._max_batch:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._dispatch(pending)
+
+    def _dispatch(self, pending):
+        request_ids = [request_id for request_id, _ in pending]
+        try:
+            request_map = {}
+            # As with describe_instances, a single unknown id fails the
+            # whole call; drop the ids named in the error and retry so
+            # their Futures resolve to None instead of the batch failure
+            # propagating to every waiter.
+            while request_ids:
+                try:
+                    response = \
+                        self._ec2_client.describe_spot_instance_requests(
+                            SpotInstanceRequestIds=request_ids)
+                except ClientError as ex:
+                    if ex.response.get('Error', {}).get('Code') != \
+                            'InvalidSpotInstanceRequestID.NotFound':
+                        raise
+                    bad_ids = set(self._NOT_FOUND_RE.findall(str(ex))) & \
+                        set(request_ids)
+                    if not bad_ids:
+                        raise
+                    request_ids = [r for r in request_ids
+                                   if r not in bad_ids]
+                    continue
+                for request in response['SpotInstanceRequests']:
+                    request_map[request['SpotInstanceRequestId']] = request
+                break
+            for request_id, future in pending:
+                future.set_result(request_map.get(request_id))
+        except Exception as ex:
+            for _, future in pending:
+                future.set_exception(ex)
+
 
 class AWSAutoscalinGroupMM(object):
     """This class has metadata associated with an autoscaling group."""
 
+    # Clusters can have thousands of ASG objects. With a fixed set of
+    # attributes, __slots__ avoids a per-instance __dict__ and makes
+    # attribute lookups cheaper.
+    __slots__ = ('asg_info', 'lc_info', 'bid_info', 'instance_info',
+                 '_tag_map', '_instances_tuple', '_mm_tag',
+                 '_user_data_decoded')
+
     def __init__(self):
         # 'asg_info' is populated with the returned value of
         # describe_autoscaling_groups() API.
@@ -21,33 +290,55 @@ class AWSAutoscalinGroupMM(object):
         # Metadata about all instances running in this ASG, keyed by instance-id.
         self.instance_info = {}
 
+        # The ASG's tags keyed by tag key, built once in set_asg_info so
+        # that tag reads are O(1) instead of scanning the tag list.
+        self._tag_map = {}
+
+        # Cached snapshot of instance_info.values(), invalidated whenever
+        # instances are added or removed.
+        self._instances_tuple = None
+
+        # Normalized minion-manager tag value, computed in set_asg_info
+        # since it can't change until the next refresh.
+        self._mm_tag = "no-spot"
+
+        # The launch-config's UserData, base64-decoded once in
+        # set_lc_info; cloud-init payloads can be tens of KB and decoding
+        # them per launch-config creation adds up.
+        self._user_data_decoded = None
+
     def get_name(self):
         """ Convenience method to get the name of the ASG. """
         return self.asg_info.AutoScalingGroupName
 
     def set_asg_info(self, asg_info):
         """ Sets the asg_info. """
-        assert asg_info is not None, "Can't set ASG info to None!"
         self.asg_info = asg_info
-        for tag in self.asg_info['Tags']:
-            if tag.get('Key') == MINION_MANAGER_LABEL:
-                if tag['Value'] not in ("use-spot", "no-spot"):
-                    tag['Value'] = 'no-spot'
-            elif tag.get('Key') == NOT_TERMINATE_LABEL:
-                if tag['Value'].lower() == 'true':
-                    tag['Value'] = True
-                else:
-                    tag['Value'] = False
+        self._tag_map = {tag['Key']: tag for tag in asg_info['Tags']}
+        tag = self._tag_map.get(MINION_MANAGER_LABEL)
+        if tag and tag['Value'] not in ("use-spot", "no-spot"):
+            tag['Value'] = 'no-spot'
+        self._mm_tag = tag['Value'].lower() if tag else "no-spot"
+        tag = self._tag_map.get(NOT_TERMINATE_LABEL)
+        if tag:
+            tag['Value'] = tag['Value'].lower() == 'true'
 
     def set_lc_info(self, lc_info):
         """ Sets the lc_info. """
-        assert lc_info is not None, "Can't set lc_info info to None!"
         self.lc_info = lc_info
+        self._user_data_decoded = base64.b64decode(
+            lc_info.get('UserData') or '')
 
     def set_bid_info(self, bid_info):
         """ Sets the bif_info. """
-        assert bid_info is not None, "Can't set bid_info info to None!"
         self.bid_info = bid_info
+        # A bid change is typically followed by launch-config and ASG
+        # updates. Drop any cached Describe* responses for this ASG so the
+        # next read goes back to AWS.
+        if self.asg_info is not None:
+            DESCRIBE_CACHE.invalidate(self.get_name())
+        if self.lc_info is not None:
+            DESCRIBE_CACHE.invalidate(self.lc_info.LaunchConfigurationName)
 
     def get_asg_info(self):
         """ Returns the asg_info. """
@@ -57,6 +348,10 @@ class AWSAutoscalinGroupMM(object):
         """ Returns the lc_info. """
         return self.lc_info
 
+    def get_user_data_decoded(self):
+        """ Returns the launch-config's UserData, already base64-decoded. """
+        return self._user_data_decoded
+
     def get_bid_info(self):
         """ Returns the bid_info. """
         return self.bid_info
@@ -66,26 +361,80 @@ class AWSAutoscalinGroupMM(object):
         present.
         """
         for instance in instances:
-            if instance.InstanceId not in self.instance_info:
-                self.instance_info[instance.InstanceId] = instance
+            self.instance_info.setdefault(instance.InstanceId, instance)
+        self._instances_tuple = None
+
+    @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
+    def refresh_instances(self, ec2_client, batcher=None):
+        """
+        Fetches metadata about this ASG's instances and records the running
+        ones. With a 'batcher' (InstanceDescribeBatcher), the lookups are
+        coalesced with those of other ASGs refreshing concurrently;
+        otherwise describe_instances is called directly in batches of
+        1000 ids (the API maximum).
+        """
+        # Collect into a set: an instance reported twice (e.g. via both
+        # the live and rebalance paths) shouldn't inflate the request or
+        # the response iteration.
+        current_ids = {i['InstanceId']
+                       for i in self.asg_info['Instances']
+                       if i.get('InstanceId')}
+
+        # Prune ids that have left the ASG before fetching. The metas
+        # live across cycles, so without this an instance replaced by a
+        # spot reclaim or health replacement keeps its last-seen
+        # 'running' record forever and stays visible to the termination
+        # scheduler and the price reporter.
+        stale_ids = [instance_id for instance_id in self.instance_info
+                     if instance_id not in current_ids]
+        for instance_id in stale_ids:
+            self.remove_instance(instance_id)
+
+        instance_ids = list(current_ids)
+        if not instance_ids:
+            return
+
+        running_instances = []
+        # Bind the hot lookups once; the loops below run per instance.
+        _running = self.is_instance_running
+        _append = running_instances.append
+        if batcher is not None:
+            futures = [batcher.describe(i) for i in instance_ids]
+            for future in futures:
+                instance = future.result()
+                if instance is not None and _running(instance):
+                    _append(bunchify(instance))
+        else:
+            for start in range(0, len(instance_ids), 1000):
+                chunk = instance_ids[start:start + 1000]
+                response = ec2_client.describe_instances(InstanceIds=chunk)
+                # Filter on the raw dicts and only bunchify the instances
+                # we keep; wrapping the whole response allocates
+                # attribute-dicts for every stopped instance and
+                # reservation too.
+                for resv in response['Reservations']:
+                    for instance in resv['Instances']:
+                        if _running(instance):
+                            _append(bunchify(instance))
+        self.add_instances(running_instances)
 
     def remove_instance(self, instance_id):
         """Removes the given instance from the 'instances' array."""
         self.instance_info.pop(instance_id, None)
+        self._instances_tuple = None
 
     def get_instance_info(self):
         """ Returns the instances. """
         return self.instance_info
 
     def get_instances(self):
-        """ Returns the 'instance' objects. """
-        return self.instance_info.values()
+        """ Returns a cached snapshot of the 'instance' objects. """
+        if self._instances_tuple is None:
+            self._instances_tuple = tuple(self.instance_info.values())
+        return self._instances_tuple
 
     def get_mm_tag(self):
-        for tag in self.asg_info['Tags']:
-            if tag.get('Key') == MINION_MANAGER_LABEL:
-                return tag['Value'].lower()
-        return "no-spot"
+        return self._mm_tag
 
     def get_instance_name(self, instance):
         """ Returns the name of the instance """
@@ -98,20 +447,12 @@ class AWSAutoscalinGroupMM(object):
 
     def is_instance_running(self, instance):
         """ Returns whether the instance is running """
-        if "State" not in instance:
-            return False
-
-        if "Name" not in instance["State"]:
-            return False
-
-        if instance["State"]["Name"].lower() != "running":
-            return False
-
-        return True
+        state = (instance.get("State") or {}).get("Name")
+        return bool(state) and state.lower() == _RUNNING_STATE
 
     def not_terminate_instance(self):
         """ Returns if the ASG is configure to not terminate instances """
-        for tag in self.asg_info['Tags']:
-            if tag.get('Key') == NOT_TERMINATE_LABEL:
-                return tag['Value']
-        return False
+        tag = self._tag_map.get(NOT_TERMINATE_LABEL)
+        if tag is None:
+            return False
+        return tag['Value']
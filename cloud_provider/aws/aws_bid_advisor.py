@@ -1,15 +1,22 @@
 """BidAdvisor implementation for AWS."""
 
-import csv
 from datetime import datetime, timedelta
 import logging
+from operator import itemgetter
 import threading
 import time
 
-import boto3
-import requests
+try:
+    # orjson parses the large Pricing API payloads several times faster
+    # than the stdlib. Fall back to stdlib json where it isn't available
+    # (e.g. on Python 2).
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 from retrying import retry
 from constants import SECONDS_PER_MINUTE
+from .asg_mm import shared_boto3_client
 
 
 logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s " +
@@ -19,20 +26,14 @@ logger = logging.getLogger("aws.minion-manager.bid-advisor")
 
 # Info about AWS Pricing API:
 # https://aws.amazon.com/blogs/aws/new-aws-price-list-api/
-# Info about reading the csv:
-# http://docs.aws.amazon.com/awsaccountbilling/latest/aboutv2/reading-an-offer.html
 HOURLY_TERM_CODE = 'JRTCKXETXF'
 RATE_CODE = '6YS6EN2CT7'
 
-def aws_pricing_url(region):
-    """
-    retruns URL per region, Using the Bulk API
-    """
-    base_url = "https://pricing.us-east-1.amazonaws.com"
-    url = "{0}/offers/v1.0/aws/AmazonEC2/current/{1}/index.csv".format(base_url, region)
-    return url
+# The Pricing API endpoint only exists in a couple of regions; us-east-1
+# serves pricing for all regions.
+PRICING_API_REGION = 'us-east-1'
 
-# The pricing API provided above only uses long region names and not the short
+# The pricing API only uses long region names and not the short
 # one (like us-west-2). And, there
 # doesn't seem to be any API that maps the short names to the long names.
 # Therefore, we have to maintain this mapping ourselves.
@@ -84,7 +85,15 @@ class AWSBidAdvisor(object):
         # 'us-west-2a'}, ...]
         self.spot_price_list = []
 
-        self.ec2 = boto3.Session().client('ec2', region_name=region)
+        # Index of the latest spot price keyed by (instance-type, AZ),
+        # rebuilt on every refresh so bid queries are O(1) lookups instead
+        # of scans over spot_price_list.
+        self.spot_price_dict = {}
+
+        self.ec2 = shared_boto3_client('ec2', region)
+
+        # Client for the AWS Pricing API, used for on-demand prices.
+        self.pricing = shared_boto3_client('pricing', PRICING_API_REGION)
 
         # The interval at which the on-demand pricing information should be
         # refreshed. The on-demand pricing doesn't change often. It should be
@@ -100,17 +109,36 @@ class AWSBidAdvisor(object):
         self.terminate_thread = False
         self.all_bid_advisor_threads = []
 
+        # Signalled by shutdown() so the scheduler thread stops promptly
+        # instead of sleeping out its refresh interval.
+        self._stop = threading.Event()
+
         self.lock = threading.Lock()
 
-    class OnDemandUpdater(threading.Thread):
+    class OnDemandUpdater(object):
         """
-        This thread periodically updates the on-demand instance pricing.
+        Fetches and parses the on-demand instance pricing.
         """
         def __init__(self, bid_advisor):
-            threading.Thread.__init__(self)
             assert bid_advisor, "BidAdvisor can't be None"
             self.bid_advisor = bid_advisor
 
+        def update_price_entry(self, instance_type, price):
+            """
+            Records the given on-demand price, keeping the highest known
+            non-zero price per instance type.
+            """
+            old_price = self.bid_advisor.on_demand_price_dict.get(instance_type, None)
+            if old_price is None:
+                self.bid_advisor.on_demand_price_dict[instance_type] = price
+            else:
+                if price == 0.00:
+                    logger.info("Found on-demand instance price of 0 for {}. Ignoring ...".format(instance_type))
+                elif price > float(old_price):
+                    logger.info("Found alternate price for {}. Old price {}, new price {}. Updated!".format(
+                        instance_type, old_price, price))
+                    self.bid_advisor.on_demand_price_dict[instance_type] = price
+
         def parse_price_row(self, row):
             region_full_name = AWS_REGIONS[self.bid_advisor.region]
             if HOURLY_TERM_CODE + "." + RATE_CODE in row["RateCode"] and \
@@ -120,58 +148,56 @@ class AWSBidAdvisor(object):
                     row["Operating System"] == "Linux" and \
                     row["Pre Installed S/W"] == "NA" and \
                     row["Tenancy"] == "Shared":
-                price = row["PricePerUnit"]
-                instance_type = row["Instance Type"]
-                old_price = self.bid_advisor.on_demand_price_dict.get(instance_type, None)
-                if old_price is None:
-                    self.bid_advisor.on_demand_price_dict[instance_type] = price
-                else:
-                    if float(price) == 0.00:
-                        logger.info("Found on-demand instance price of 0 for {}. Ignoring ...".format(instance_type))
-                    elif float(price) > float(old_price):
-                        logger.info("Found alternate price for {}. Old price {}, new price {}. Updated!".format(
-                            instance_type, old_price, price))
-                        self.bid_advisor.on_demand_price_dict[instance_type] = price
+                # Convert to float once at ingestion so bid decisions
+                # compare raw floats.
+                self.update_price_entry(row["Instance Type"],
+                                        float(row["PricePerUnit"]))
 
         @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
         def get_on_demand_pricing(self):
-            """ Issues the AWS api for getting on-demand pricing info. """
-            resp = requests.get(url=aws_pricing_url(self.bid_advisor.region), stream=True)
-            line_iterator = resp.iter_lines()
-            line = None
-            for line in line_iterator:
-                # Ignore lines till the PriceDescription is reached.
-                if "PriceDescription" in line:
-                    line = line.replace('"', '')
-                    break
-            assert line, "Failed while iteration over on-demand price info"
-            reader = csv.DictReader(line_iterator, fieldnames=line.split(','))
-            for row in reader:
-                self.parse_price_row(row)
+            """ Issues the AWS Pricing API for on-demand pricing info. """
+            region_full_name = AWS_REGIONS[self.bid_advisor.region]
+            paginator = self.bid_advisor.pricing.get_paginator(
+                'get_products')
+            pages = paginator.paginate(
+                ServiceCode='AmazonEC2',
+                Filters=[
+                    {'Type': 'TERM_MATCH', 'Field': 'location',
+                     'Value': region_full_name},
+                    {'Type': 'TERM_MATCH', 'Field': 'operatingSystem',
+                     'Value': 'Linux'},
+                    {'Type': 'TERM_MATCH', 'Field': 'preInstalledSw',
+                     'Value': 'NA'},
+                    {'Type': 'TERM_MATCH', 'Field': 'tenancy',
+                     'Value': 'Shared'},
+                ])
+            for page in pages:
+                for price_item in page['PriceList']:
+                    product = _json.loads(price_item)
+                    instance_type = product.get('product', {}). \
+                        get('attributes', {}).get('instanceType')
+                    if not instance_type:
+                        continue
+                    terms = product.get('terms', {}).get('OnDemand', {})
+                    for term in terms.values():
+                        for dimension in term.get('priceDimensions',
+                                                  {}).values():
+                            if 'On Demand' not in dimension.get(
+                                    'description', ''):
+                                continue
+                            price = dimension.get('pricePerUnit',
+                                                  {}).get('USD')
+                            if price is not None:
+                                self.update_price_entry(instance_type,
+                                                        float(price))
 
             logger.info("On-demand pricing info updated")
 
-        def run(self):
-            """ Main method of the OnDemandUpdater thread. """
-            orig_interval = self.bid_advisor.on_demand_refresh_interval
-            while self.bid_advisor.terminate_thread is False:
-                try:
-                    self.get_on_demand_pricing()
-                    self.bid_advisor.on_demand_refresh_interval = orig_interval
-                except Exception as ex:
-                    logger.info("Error while getting on-demand price " +
-                                    "info: " + str(ex))
-                    logger.info("Retrying after 2 minutes")
-                    self.bid_advisor.on_demand_refresh_interval = 2 * SECONDS_PER_MINUTE
-                finally:
-                    time.sleep(self.bid_advisor.on_demand_refresh_interval)
-
-    class SpotInstancePriceUpdater(threading.Thread):
+    class SpotInstancePriceUpdater(object):
         """
-        This thread periodically updates the spot instance pricing.
+        Fetches and parses the spot instance pricing.
         """
         def __init__(self, bid_advisor):
-            threading.Thread.__init__(self)
             assert bid_advisor, "BidAdvisor can't be None"
             self.bid_advisor = bid_advisor
 
@@ -180,39 +206,86 @@ class AWSBidAdvisor(object):
             ec2 = self.bid_advisor.ec2
             hour_ago = datetime.now() - timedelta(hours=1)
             spot_price_info = []
-            next_token = ''
-            while True:
-                try:
-                    response = ec2.describe_spot_price_history(
+            try:
+                # Filter server-side (product and time-window) and let the
+                # paginator fetch full pages so the payload stays small.
+                paginator = ec2.get_paginator('describe_spot_price_history')
+                for page in paginator.paginate(
                         ProductDescriptions=['Linux/UNIX (Amazon VPC)'],
-                        StartTime=hour_ago, NextToken=next_token)
-                    if response is None:
-                        raise Exception("Failed to get spot-instance prices")
-                    spot_price_info += response['SpotPriceHistory']
-                    if response['NextToken']:
-                        next_token = response['NextToken']
-                    else:
-                        return spot_price_info
-                except Exception as ex:
-                    raise Exception("Failed to get spot instance pricing info: " + str(ex))
+                        StartTime=hour_ago,
+                        PaginationConfig={'PageSize': 1000}):
+                    spot_price_info += page['SpotPriceHistory']
+                return spot_price_info
+            except Exception as ex:
+                raise Exception("Failed to get spot instance pricing info: " + str(ex))
 
         def get_spot_price_info(self):
             """ Issues AWS apis to get spot instance prices. """
             spot_price_info = self.ec2_get_spot_price_history()
+            # Tolerate being handed a raw describe_spot_price_history
+            # response as well as the flattened history list.
+            if isinstance(spot_price_info, dict):
+                spot_price_info = spot_price_info.get('SpotPriceHistory', [])
+            # Sort oldest-first with a C-level key and overwrite in a
+            # single pass so the latest price per (instance-type, AZ)
+            # wins.
+            spot_price_dict = {}
+            for price_info in sorted(spot_price_info,
+                                     key=itemgetter('Timestamp')):
+                spot_price_dict[(price_info['InstanceType'],
+                                 price_info['AvailabilityZone'])] = \
+                    float(price_info['SpotPrice'])
             with self.bid_advisor.lock:
                 self.bid_advisor.spot_price_list = spot_price_info
+                self.bid_advisor.spot_price_dict = spot_price_dict
             logger.info("Spot instance pricing info updated")
 
+    class PriceUpdaterScheduler(threading.Thread):
+        """
+        Single thread that refreshes the on-demand and spot pricing, each
+        on its own interval. One scheduler thread instead of one polling
+        thread per updater halves the thread count for what are two timed
+        HTTP fetches per refresh interval.
+        """
+        def __init__(self, bid_advisor):
+            threading.Thread.__init__(self, name="PriceUpdaterScheduler")
+            assert bid_advisor, "BidAdvisor can't be None"
+            self.bid_advisor = bid_advisor
+            self.od_updater = bid_advisor.OnDemandUpdater(bid_advisor)
+            self.sp_updater = bid_advisor.SpotInstancePriceUpdater(
+                bid_advisor)
+
         def run(self):
-            """ Main method of the SpotInstancePriceUpdater thread. """
-            while self.bid_advisor.terminate_thread is False:
-                try:
-                    self.get_spot_price_info()
-                except Exception as ex:
-                    raise Exception("Error while getting spot-instance " +
+            """ Main method of the PriceUpdaterScheduler thread. """
+            bid_advisor = self.bid_advisor
+            next_od_refresh = 0
+            next_spot_refresh = 0
+            while not bid_advisor._stop.is_set():
+                now = time.time()
+                if now >= next_od_refresh:
+                    try:
+                        self.od_updater.get_on_demand_pricing()
+                        next_od_refresh = now + \
+                            bid_advisor.on_demand_refresh_interval
+                    except Exception as ex:
+                        logger.info("Error while getting on-demand price " +
+                                    "info: " + str(ex))
+                        logger.info("Retrying after 2 minutes")
+                        next_od_refresh = now + 2 * SECONDS_PER_MINUTE
+                if now >= next_spot_refresh:
+                    try:
+                        self.sp_updater.get_spot_price_info()
+                        next_spot_refresh = now + \
+                            bid_advisor.spot_refresh_interval
+                    except Exception as ex:
+                        logger.info("Error while getting spot-instance " +
                                     "price info: " + str(ex))
-                finally:
-                    time.sleep(self.bid_advisor.spot_refresh_interval)
+                        logger.info("Retrying after 2 minutes")
+                        next_spot_refresh = now + 2 * SECONDS_PER_MINUTE
+                timeout = min(next_od_refresh, next_spot_refresh) - \
+                    time.time()
+                if timeout > 0:
+                    bid_advisor._stop.wait(timeout)
 
     def run(self):
         """ Main method of the AWSBidAdvisor. """
@@ -222,19 +295,14 @@ class AWSBidAdvisor(object):
 
         logger.info("Starting the BidAdvisor")
 
-        # The on_demand_thread and spot_instance_thread are run in Daemon mode.
-        # These threads will be run forever but shouldn't cause problems when
-        # the minion-manager process is terminated.
-        on_demand_thread = self.OnDemandUpdater(self)
-        on_demand_thread.setDaemon(True)
-        self.all_bid_advisor_threads.append(on_demand_thread)
+        # The scheduler thread is run in Daemon mode. It will be run forever
+        # but shouldn't cause problems when the minion-manager process is
+        # terminated.
+        scheduler_thread = self.PriceUpdaterScheduler(self)
+        scheduler_thread.setDaemon(True)
+        self.all_bid_advisor_threads.append(scheduler_thread)
 
-        spot_instance_thread = self.SpotInstancePriceUpdater(self)
-        spot_instance_thread.setDaemon(True)
-        self.all_bid_advisor_threads.append(spot_instance_thread)
-
-        on_demand_thread.start()
-        spot_instance_thread.start()
+        scheduler_thread.start()
 
         # Wait for the threads to get pricing information.
         while True:
@@ -300,8 +368,13 @@ class AWSBidAdvisor(object):
         """
         Returns the spot-instance price for the given instance_type and zone.
         """
-        # The spot price list is sorted by time. Find the latest instance
-        # for the zone and instance_type and use that as the spot price.
+        price = self.spot_price_dict.get((instance_type, zone))
+        if price is not None:
+            return price
+
+        # Fall back to scanning the raw list for callers that populated
+        # spot_price_list directly. The list is sorted by time, so the
+        # first match is the latest price.
         for price_info in self.spot_price_list:
             if price_info["InstanceType"] == instance_type and \
                     price_info["AvailabilityZone"] == zone:
@@ -309,10 +382,15 @@ class AWSBidAdvisor(object):
         return None
 
     def get_max_spot_prices_from_zones(self, instance_type, zones):
-        max_spot_price = 0.0
+        """
+        Returns the highest known spot price across the given zones, or
+        None if no zone has pricing data.
+        """
+        max_spot_price = None
         for zone in zones:
             tmp = self.get_spot_instance_price(instance_type, zone)
-            if tmp > max_spot_price:
+            if tmp is not None and (max_spot_price is None or
+                                    tmp > max_spot_price):
                 max_spot_price = tmp
 
         return max_spot_price
@@ -336,18 +414,19 @@ class AWSBidAdvisor(object):
                 logger.info("Pricing data not available! Using DEFAULT_BID")
                 return DEFAULT_BID
 
-            spot_price = self.get_max_spot_prices_from_zones(instance_type, zones)
-
+            # Check the on-demand price first: if it's missing there is no
+            # point paying for the per-zone spot lookups.
             on_demand_price = self.get_on_demand_price(instance_type)
-
-            if spot_price is None:
-                logger.error("Spot price info not found. Using DEFAULT_BID")
-                return DEFAULT_BID
             if on_demand_price is None:
                 logger.error("On demand price info not found. " +
                              "Using DEFAULT_BID")
                 return DEFAULT_BID
 
+            spot_price = self.get_max_spot_prices_from_zones(instance_type, zones)
+            if spot_price is None:
+                logger.error("Spot price info not found. Using DEFAULT_BID")
+                return DEFAULT_BID
+
             logger.info("Using spot_instance price %f, on-demand price %f " +
                         "for instance type: %s, zones: %s",
                         spot_price, on_demand_price, instance_type, zones)
@@ -359,6 +438,7 @@ class AWSBidAdvisor(object):
     def shutdown(self):
         """ Sets the flag to terminate all threads. """
         self.terminate_thread = True
+        self._stop.set()
         for thread in self.all_bid_advisor_threads:
             thread.join()
 
@@ -1,5 +1,6 @@
 """The file has unit tests for the AWSBidAdvisor."""
 
+import json
 import unittest
 from mock import patch, MagicMock
 import datetime
@@ -8,6 +9,25 @@ from cloud_provider.aws.aws_bid_advisor import AWSBidAdvisor
 
 REFRESH_INTERVAL = 10
 REGION = 'us-west-2'
+# A single get_products PriceList entry in the Pricing API's shape: a
+# JSON string per product.
+MOCK_PRICE_LIST_ITEM = json.dumps({
+    'product': {'attributes': {'instanceType': 'm5.4xlarge'}},
+    'terms': {'OnDemand': {'ABCDEF.JRTCKXETXF': {'priceDimensions': {
+        'ABCDEF.JRTCKXETXF.6YS6EN2CT7': {
+            'description': '$0.768 per On Demand Linux m5.4xlarge '
+                           'Instance Hour',
+            'pricePerUnit': {'USD': '0.7680000000'}}}}}}
+})
+
+
+def mock_pricing_client():
+    """ Returns a mocked Pricing API client serving one price page. """
+    pricing = MagicMock()
+    pricing.get_paginator.return_value.paginate.return_value = \
+        [{'PriceList': [MOCK_PRICE_LIST_ITEM]}]
+    return pricing
+
 MOCK_SPOT_PRICE={'NextToken': '', 'SpotPriceHistory': [{'AvailabilityZone': 'us-west-2b', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.300000', 'Timestamp': datetime.datetime(2019, 7, 13, 20, 30, 22, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2c', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.291400', 'Timestamp': datetime.datetime(2019, 7, 13, 20, 13, 34, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2a', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.320100', 'Timestamp': datetime.datetime(2019, 7, 13, 18, 33, 30, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2c', 'InstanceType': 'm3.medium', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.006700', 'Timestamp': datetime.datetime(2019, 7, 13, 17, 7, 9, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2b', 'InstanceType': 'm3.medium', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.006700', 'Timestamp': datetime.datetime(2019, 7, 13, 17, 7, 9, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2a', 'InstanceType': 'm3.medium', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.006700', 'Timestamp': datetime.datetime(2019, 7, 13, 17, 7, 9, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2b', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.300400', 'Timestamp': datetime.datetime(2019, 7, 13, 15, 46, 1, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2c', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.291500', 'Timestamp': datetime.datetime(2019, 7, 13, 14, 47, 14, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2a', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.321600', 'Timestamp': datetime.datetime(2019, 7, 13, 13, 40, 47, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2d', 'InstanceType': 'm5.4xlarge', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.270400', 'Timestamp': datetime.datetime(2019, 7, 13, 6, 23, 5, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2c', 'InstanceType': 'm3.medium', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.006700', 'Timestamp': datetime.datetime(2019, 7, 12, 17, 7, 5, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2b', 'InstanceType': 'm3.medium', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.006700', 'Timestamp': datetime.datetime(2019, 7, 12, 17, 7, 5, tzinfo=tzutc())}, {'AvailabilityZone': 'us-west-2a', 'InstanceType': 'm3.medium', 'ProductDescription': 'Linux/UNIX', 'SpotPrice': '0.006700', 'Timestamp': datetime.datetime(2019, 7, 12, 17, 7, 5, tzinfo=tzutc())}], 'ResponseMetadata': {'RequestId': 'f428bcba-016f-476f-b9ed-755f71af2d36', 'HTTPStatusCode': 200, 'HTTPHeaders': {'content-type': 'text/xml;charset=UTF-8', 'content-length': '4341', 'vary': 'accept-encoding', 'date': 'Sun, 14 Jul 2019 00:45:52 GMT', 'server': 'AmazonEC2'}, 'RetryAttempts': 0}}
 
 
@@ -21,9 +41,10 @@ class AWSBidAdvisorTest(unittest.TestCase):
         Tests that the AWSBidVisor starts threads and stops them correctly.
         """
         bidadv = AWSBidAdvisor(REFRESH_INTERVAL, REFRESH_INTERVAL, REGION)
+        bidadv.pricing = mock_pricing_client()
         assert len(bidadv.all_bid_advisor_threads) == 0
         bidadv.run()
-        assert len(bidadv.all_bid_advisor_threads) == 2
+        assert len(bidadv.all_bid_advisor_threads) == 1
         bidadv.shutdown()
         assert len(bidadv.all_bid_advisor_threads) == 0
 
@@ -32,6 +53,7 @@ class AWSBidAdvisorTest(unittest.TestCase):
         Tests that the AWSBidVisor correctly gets the on-demand pricing.
         """
         bidadv = AWSBidAdvisor(REFRESH_INTERVAL, REFRESH_INTERVAL, REGION)
+        bidadv.pricing = mock_pricing_client()
         assert len(bidadv.on_demand_price_dict) == 0
         updater = bidadv.OnDemandUpdater(bidadv)
         updater.get_on_demand_pricing()
@@ -54,6 +76,7 @@ class AWSBidAdvisorTest(unittest.TestCase):
         Tests that the AXBidVisor actually updates the pricing info.
         """
         bidadv = AWSBidAdvisor(REFRESH_INTERVAL, REFRESH_INTERVAL, REGION)
+        bidadv.pricing = mock_pricing_client()
         od_updater = bidadv.OnDemandUpdater(bidadv)
         od_updater.get_on_demand_pricing()
 
@@ -119,6 +142,7 @@ class AWSBidAdvisorTest(unittest.TestCase):
         Tests that the BidAdvisor returns the most recent price information.
         """
         bidadv = AWSBidAdvisor(REFRESH_INTERVAL, REFRESH_INTERVAL, REGION)
+        bidadv.pricing = mock_pricing_client()
 
         od_updater = bidadv.OnDemandUpdater(bidadv)
         od_updater.get_on_demand_pricing()
@@ -153,18 +177,18 @@ class AWSBidAdvisorTest(unittest.TestCase):
         row["Instance Type"] = "m5.4xlarge"
 
         od_updater.parse_price_row(row)
-        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == "0.453"
+        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == 0.453
 
         od_updater.parse_price_row(row)
-        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == "0.453"
+        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == 0.453
 
         row["PricePerUnit"] = "0.658"
         od_updater.parse_price_row(row)
-        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == "0.658"
+        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == 0.658
 
         row["PricePerUnit"] = "0.00"
         od_updater.parse_price_row(row)
-        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == "0.658"
+        assert od_updater.bid_advisor.on_demand_price_dict['m5.4xlarge'] == 0.658
 
         row['RateCode'] = "Some Random RateCode"
         od_updater.parse_price_row(row)
@@ -1,5 +1,6 @@
 """Minion Manager implementation for AWS."""
 
+import json
 import logging
 import re
 import sys
@@ -7,21 +8,21 @@ import os
 import time
 import base64
 from datetime import datetime
-from threading import Timer, Semaphore
-import boto3
+from threading import Semaphore, Lock, Event
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 from retrying import retry
 from bunch import bunchify
 import pytz
-import shlex
-import subprocess
 from constants import SECONDS_PER_MINUTE, SECONDS_PER_HOUR
 from cloud_provider.aws.aws_bid_advisor import AWSBidAdvisor
 from cloud_provider.aws.price_info_reporter import AWSPriceReporter
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 from ..base import MinionManagerBase
-from .asg_mm import AWSAutoscalinGroupMM, MINION_MANAGER_LABEL
+from .asg_mm import AWSAutoscalinGroupMM, InstanceDescribeBatcher, \
+    SpotRequestBatcher, MINION_MANAGER_LABEL, DESCRIBE_CACHE, \
+    shared_boto3_client
 
 logger = logging.getLogger("aws_minion_manager")
 logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s " +
@@ -31,6 +32,97 @@ logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s " +
 logging.getLogger('boto3').setLevel(logging.WARNING)
 logging.getLogger('botocore').setLevel(logging.WARNING)
 
+# Matches the EC2 instance-id embedded in a node's spec.provider_id
+# (e.g. "aws:///us-west-2a/i-0abcd1234"). Instance ids are 8 (legacy)
+# or 17 hex characters.
+_PROVIDER_ID_RE = re.compile(r'i-[0-9a-f]{8,17}')
+
+# Extracts the spot-request id from a scaling activity's StatusMessage.
+_SPOT_REQ_RE = re.compile(r'Placed Spot instance request: '
+                          r'(?P<spot_req_id>sir-[a-zA-Z0-9]+)\. '
+                          r'Waiting for instance\(s\)')
+
+# This error message from https://docs.aws.amazon.com/autoscaling/ec2/userguide/ts-as-capacity.html#ts-as-capacity-1
+INSUFFICIENT_CAPACITY_MESSAGE = ['We currently do not have sufficient',
+                                 'capacity in the Availability Zone you requested']
+
+WAITING_SPOT_INSTANCE_MESSAGE = ['Placed Spot instance request:',
+                                 'Waiting for instance(s)']
+
+# Template for an on-demand bid; callers get shallow copies since
+# bid_info dicts are stored and compared on the ASG metas.
+_ON_DEMAND_BID = {"type": "on-demand", "price": ""}
+
+
+class BidInfoCache(object):
+    """
+    Stale-while-revalidate cache around BidAdvisor.get_new_bid. The
+    reconcile loops ask for the same (zones, instance-type) bid once per
+    instance; identical queries within the TTL are served from memory,
+    and stale entries are refreshed in the background while callers keep
+    getting the previous bid. Entries older than the max-staleness bound
+    (background refreshes failing repeatedly) are refreshed synchronously
+    so a broken advisor can't pin an arbitrarily old bid.
+    """
+
+    def __init__(self, bid_advisor, executor, ttl_seconds=60,
+                 max_staleness_seconds=600):
+        self._bid_advisor = bid_advisor
+        self._executor = executor
+        self._ttl_seconds = ttl_seconds
+        # Once an entry is this old the background refreshes have been
+        # failing for a while; get_bid then refreshes synchronously
+        # instead of serving an ever-staler bid.
+        self._max_staleness_seconds = max_staleness_seconds
+        # key -> (bid, cached_at), key = (tuple(sorted(zones)), type).
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = Lock()
+
+    def get_bid(self, zones, instance_type):
+        """ Returns the (possibly cached) bid for zones/instance_type. """
+        key = (tuple(sorted(zones)), instance_type)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return self._refresh(key, zones, instance_type)
+
+        bid, cached_at = entry
+        age = time.time() - cached_at
+        if age >= self._max_staleness_seconds:
+            return self._refresh(key, zones, instance_type)
+        if age >= self._ttl_seconds:
+            self._schedule_refresh(key, zones, instance_type)
+        return bid
+
+    def _schedule_refresh(self, key, zones, instance_type):
+        """ Kicks off one background refresh for the given key. """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._background_refresh, key, zones,
+                              instance_type)
+
+    def _background_refresh(self, key, zones, instance_type):
+        try:
+            self._refresh(key, zones, instance_type)
+        except Exception as exc:
+            # The executor Future is discarded, so without this the
+            # failure would vanish and the stale bid would be served
+            # with no trace of why it never updates.
+            logger.error("Background bid refresh failed for %s: %s",
+                         key, str(exc))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key, zones, instance_type):
+        bid = self._bid_advisor.get_new_bid(zones, instance_type)
+        with self._lock:
+            self._entries[key] = (bid, time.time())
+        return bid
+
 
 class AWSMinionManager(MinionManagerBase):
     """
@@ -41,30 +133,85 @@ class AWSMinionManager(MinionManagerBase):
         super(AWSMinionManager, self).__init__(region)
         self._cluster_name = cluster_name
         aws_profile = kwargs.get("aws_profile", None)
-        if aws_profile:
-            boto_session = boto3.Session(region_name=region,
-                                         profile_name=aws_profile)
-        else:
-            boto_session = boto3.Session(region_name=region)
 
         self.incluster = kwargs.get("incluster", True)
-        self._ac_client = boto_session.client('autoscaling')
-        self._ec2_client = boto_session.client('ec2')
+        self._ac_client = shared_boto3_client('autoscaling', region,
+                                              aws_profile)
+        self._ec2_client = shared_boto3_client('ec2', region, aws_profile)
         self._events_only = kwargs.get("events_only", False)
 
         self._refresh_interval_seconds = refresh_interval_seconds
+        # TTL for cached Describe* responses. Tunable per cluster via the
+        # 'ttl_seconds' kwarg (through Broker.get_impl_object).
+        DESCRIBE_CACHE.ttl_seconds = kwargs.get(
+            "ttl_seconds", DESCRIBE_CACHE.ttl_seconds)
         self._asg_metas = []
         self.instance_type = None
         # Setting default termination to one instance at a time
         self.terminate_percentage = 1
 
+        # Futures of scheduled terminations keyed by instance-id. The
+        # dict doubles as the "already scheduled" set; entries are
+        # removed by the termination workers, so every access goes
+        # through _scheduled_lock.
         self.on_demand_kill_threads = {}
+        self._scheduled_lock = Lock()
         self.minions_ready_checker_thread = None
 
+        # Set by shutdown(); lets the main loop's cooling-off wait end
+        # immediately instead of sleeping out the refresh interval.
+        self._stop_event = Event()
+
+        # Newest scaling-activity id seen per ASG; lets activity polls
+        # early-exit instead of re-reading the full history.
+        self._last_activity_id = {}
+
+        # Cached (timestamp, response) of the last tag-filtered ASG
+        # discovery. ASG membership rarely changes, so the list is
+        # served from memory and re-fetched in the background once it
+        # ages past the refresh interval.
+        self._asg_discovery_cache = None
+        self._discovery_refreshing = False
+        # Fingerprint of the last discovery the ASG metas were built
+        # from; lets the loop skip the rebuild when nothing changed.
+        self._last_discovery_fingerprint = None
+
+        # Lazily created CoreV1Api client plus a TTL-cached map of
+        # instance-id -> k8s node name, so that terminating N instances
+        # costs one list_node call instead of N.
+        self._k8s_api = None
+        self._instance_to_node = {}
+        self._node_map_expiry = 0
+
+        # Bounded pool for scheduled instance terminations. A fixed number
+        # of workers replaces the one-OS-thread-per-instance Timers, which
+        # don't scale to large clusters.
+        self._term_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('MM_MAX_PARALLEL', '32')))
+
+        # Pool for running per-ASG refresh work concurrently, so a
+        # cluster-wide refresh costs roughly the latency of the slowest
+        # ASG instead of the sum over all ASGs. Kept separate from the
+        # termination pool so neither starves the other.
+        self._asg_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('MM_PARALLEL_ASG_WORKERS', '8')))
+
+        # Coalesce concurrent per-ASG describe_instances and
+        # spot-request lookups into batched API calls.
+        self._instance_batcher = InstanceDescribeBatcher(self._ec2_client)
+        self._spot_batcher = SpotRequestBatcher(self._ec2_client)
+
+        # Small pool for posting k8s events so that apiserver write
+        # latency stays off the refresh loop's critical path.
+        self._event_executor = ThreadPoolExecutor(max_workers=2)
+
         self.bid_advisor = AWSBidAdvisor(
             on_demand_refresh_interval=4 * SECONDS_PER_HOUR,
             spot_refresh_interval=15 * SECONDS_PER_MINUTE, region=region)
 
+        self._bid_cache = BidInfoCache(self.bid_advisor,
+                                       self._term_executor)
+
         self.price_reporter = AWSPriceReporter(
             self._ec2_client, self.bid_advisor, self._asg_metas)
 
@@ -72,70 +219,209 @@ class AWSMinionManager(MinionManagerBase):
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
     def describe_asg_with_retries(ac_client, asgs=[]):
         """
-        AWS describe_auto_scaling_groups with retries.
+        AWS describe_auto_scaling_groups with retries. Returns the raw
+        response dict; callers only read a couple of scalar fields, so
+        recursively wrapping the whole response isn't worth the
+        allocations.
         """
+        cache_key = ("describe_auto_scaling_groups", tuple(asgs))
+        cached = DESCRIBE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
         response = ac_client.describe_auto_scaling_groups(
             AutoScalingGroupNames=asgs)
-        return bunchify(response)
+        DESCRIBE_CACHE.put(cache_key, response)
+        return response
 
     @staticmethod
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-    def describe_asg_activities_with_retries(ac_client, asg):
+    def bulk_describe_asgs(ac_client, asg_names):
         """
-        AWS describe_auto_scaling_groups with retries.
+        AWS describe_auto_scaling_groups for many ASGs at once.
+
+        The names are sliced into chunks of 100 (the API maximum) so that
+        refreshing N ASGs needs ceil(N/100) calls instead of N. Returns a
+        dict of AutoScalingGroupName -> ASG info.
         """
-        response = ac_client.describe_scaling_activities(
-            AutoScalingGroupName=asg)
-        return bunchify(response)
+        asg_map = {}
+        for start in range(0, len(asg_names), 100):
+            chunk = asg_names[start:start + 100]
+            next_token = ''
+            while True:
+                response = ac_client.describe_auto_scaling_groups(
+                    AutoScalingGroupNames=chunk, MaxRecords=100,
+                    NextToken=next_token)
+                # Wrap each ASG rather than the whole page: the page also
+                # carries response metadata nobody reads.
+                for asg in response['AutoScalingGroups']:
+                    asg_map[asg['AutoScalingGroupName']] = bunchify(asg)
+                next_token = response.get('NextToken')
+                if not next_token:
+                    break
+        # Seed the per-name describe cache from this batch, so later
+        # single-ASG lookups in the same cycle (convergence checks) are
+        # served from memory instead of re-describing one name at a
+        # time.
+        for name, asg in asg_map.items():
+            DESCRIBE_CACHE.put(("describe_auto_scaling_groups", (name,)),
+                               {'AutoScalingGroups': [asg]})
+        return asg_map
 
     @staticmethod
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-    def get_instances_with_retries(ec2_client, instance_ids):
+    def bulk_describe_launch_configurations(ac_client, lc_names):
         """
-        AWS describe_instances with retries.
+        AWS describe_launch_configurations for many launch-configs at once.
+
+        Dedupes the given names, fetches them in chunks of 50 (the API
+        maximum) while paginating with NextToken and returns a dict of
+        LaunchConfigurationName -> launch-config info.
         """
-        response = ec2_client.describe_instances(
-            InstanceIds=instance_ids)
-        return bunchify(response)
+        unique_names = list(set(lc_names))
+        cache_key = ("describe_launch_configurations",
+                     tuple(sorted(unique_names)))
+        cached = DESCRIBE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        lc_map = {}
+        for start in range(0, len(unique_names), 50):
+            chunk = unique_names[start:start + 50]
+            next_token = ''
+            while True:
+                response = ac_client.describe_launch_configurations(
+                    LaunchConfigurationNames=chunk, MaxRecords=50,
+                    NextToken=next_token)
+                for lc in response['LaunchConfigurations']:
+                    lc_map[lc['LaunchConfigurationName']] = bunchify(lc)
+                next_token = response.get('NextToken')
+                if not next_token:
+                    break
+        DESCRIBE_CACHE.put(cache_key, lc_map)
+        return lc_map
 
     @staticmethod
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-    def get_asgs_with_tags(cluster_name, ac_client):
+    def describe_asg_activities_with_retries(ac_client, asg,
+                                             since_activity_id=None):
         """
-        Get AWS describe_auto_scaling_groups with k8s-minion-manager tags.
+        AWS describe_scaling_activities with retries. Paginates at 20
+        records per page and stops as soon as 'since_activity_id' (the
+        newest activity a previous call saw) is reached, so steady-state
+        polls read one page instead of the ASG's full activity history.
+        The scan is capped at 100 records either way — callers only care
+        about the recent in-progress activities at the head of the
+        (newest-first) list, and without the cap a missing or
+        never-reached marker would walk weeks of history. Responses are
+        served from DESCRIBE_CACHE within its TTL so back-to-back checks
+        in one cycle share a single fetch.
         """
-        response = {}
-        response["AutoScalingGroups"] = []
-        resp = ac_client.describe_auto_scaling_groups(MaxRecords=100)
-        for r in resp["AutoScalingGroups"]:
-            is_candidate = False
-            # skipping if ASG is using LaunchTemplate as it is not supported
-            if not r.get("LaunchConfigurationName"):
-                logger.warn("Skipping: asg %s is using LaunchTemplate", r.get("AutoScalingGroupName"))
-                continue
-            # Scan for KubernetesCluster name. If the value matches the cluster_name
-            # provided in the input, set 'is_candidate'.
-            for tag in r['Tags']:
-                if tag['Key'] == 'KubernetesCluster' and tag['Value'] == cluster_name:
-                    is_candidate = True
-            if not is_candidate:
-                continue
-            for tag in r['Tags']:
-                if tag['Key'] == MINION_MANAGER_LABEL:
-                    response["AutoScalingGroups"].append(r)
+        cache_key = ("describe_scaling_activities", asg, since_activity_id)
+        cached = DESCRIBE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        activities = []
+        found_marker = False
+        paginator = ac_client.get_paginator('describe_scaling_activities')
+        # Small pages keep the response and its XML parse cheap; the
+        # MaxItems cap bounds the whole scan.
+        for page in paginator.paginate(
+                AutoScalingGroupName=asg,
+                PaginationConfig={'PageSize': 20, 'MaxItems': 100}):
+            for activity in page['Activities']:
+                if activity['ActivityId'] == since_activity_id:
+                    found_marker = True
                     break
-        return bunchify(response)
+                activities.append(activity)
+            if found_marker:
+                break
+        result = {'Activities': activities}
+        DESCRIBE_CACHE.put(cache_key, result)
+        return result
 
     @staticmethod
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-    def describe_spot_request_with_retries(ec2_client, request_ids):
-        response = ec2_client.describe_spot_instance_requests(
-            SpotInstanceRequestIds=request_ids)
-        return bunchify(response)
+    def get_asgs_with_tags(cluster_name, ac_client):
+        """
+        Get AWS describe_auto_scaling_groups with k8s-minion-manager tags.
+        """
+        matching_asgs = []
+        paginator = ac_client.get_paginator('describe_auto_scaling_groups')
+        for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+            for r in page["AutoScalingGroups"]:
+                # skipping if ASG is using LaunchTemplate as it is not supported
+                if not r.get("LaunchConfigurationName"):
+                    logger.warn("Skipping: asg %s is using LaunchTemplate", r.get("AutoScalingGroupName"))
+                    continue
+                # The ASG is a candidate if its KubernetesCluster tag matches
+                # the cluster_name provided in the input and it carries the
+                # minion-manager label.
+                tags = {tag['Key']: tag['Value'] for tag in r['Tags']}
+                if tags.get('KubernetesCluster') != cluster_name:
+                    continue
+                if MINION_MANAGER_LABEL in tags:
+                    matching_asgs.append(r)
+        return bunchify({"AutoScalingGroups": matching_asgs})
+
+    @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
+    def describe_spot_request_with_retries(self, ec2_client, request_ids):
+        """
+        Looks up spot requests through the coalescing batcher, so
+        lookups from concurrently reconciling ASGs share one
+        describe_spot_instance_requests call.
+        """
+        futures = [self._spot_batcher.describe(r) for r in request_ids]
+        requests = [f.result() for f in futures]
+        return {'SpotInstanceRequests':
+                [r for r in requests if r is not None]}
+
+    def _discover_asgs_cached(self):
+        """
+        Returns the tag-filtered discovery response, stale-while-
+        revalidate style: a cached list is served synchronously and
+        refreshed in the background once it is older than the refresh
+        interval, so steady-state loops don't re-scan every ASG's tags.
+        """
+        cached = self._asg_discovery_cache
+        if cached is None:
+            response = AWSMinionManager.get_asgs_with_tags(
+                self._cluster_name, self._ac_client)
+            self._asg_discovery_cache = (time.time(), response)
+            return response
+        timestamp, response = cached
+        if time.time() - timestamp >= self._refresh_interval_seconds and \
+                not self._discovery_refreshing:
+            self._discovery_refreshing = True
+            self._asg_executor.submit(self._background_discovery_refresh)
+        return response
+
+    def _background_discovery_refresh(self):
+        try:
+            response = AWSMinionManager.get_asgs_with_tags(
+                self._cluster_name, self._ac_client)
+            self._asg_discovery_cache = (time.time(), response)
+        except Exception as ex:
+            logger.error("Failed to refresh ASG discovery: %s", str(ex))
+        finally:
+            self._discovery_refreshing = False
+
+    def invalidate_asg_cache(self):
+        """ Forces the next discovery to go back to AWS. """
+        self._asg_discovery_cache = None
+
+    @staticmethod
+    def _discovery_fingerprint(response):
+        """ A comparable summary of a discovery response, used to skip
+        rebuilding the ASG metas when nothing relevant changed. """
+        return tuple(sorted(
+            (asg.AutoScalingGroupName, asg.LaunchConfigurationName,
+             asg.DesiredCapacity)
+            for asg in response.AutoScalingGroups))
 
     def discover_asgs(self):
         """ Query AWS and get metadata about all required ASGs. """
-        response = AWSMinionManager.get_asgs_with_tags(self._cluster_name, self._ac_client)
+        response = self._discover_asgs_cached()
+        self._last_discovery_fingerprint = \
+            self._discovery_fingerprint(response)
         for asg in response.AutoScalingGroups:
             asg_mm = AWSAutoscalinGroupMM()
             asg_mm.set_asg_info(asg)
@@ -148,18 +434,21 @@ class AWSMinionManager(MinionManagerBase):
         Queries AWS to get current bid_price for all ASGs and stores it
         in AWSAutoscalinGroupMM.
         """
-        @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-        def _describe_launch_configuration():
-            response = self._ac_client.describe_launch_configurations(
-                LaunchConfigurationNames=[asg.LaunchConfigurationName])
-            assert len(response["LaunchConfigurations"]) == 1
-            return bunchify(response).LaunchConfigurations[0]
+        if not self._asg_metas:
+            return
+
+        # Get all launch configurations with one batched call and
+        # distribute the results to the ASGs.
+        lc_names = [asg_meta.asg_info.LaunchConfigurationName
+                    for asg_meta in self._asg_metas]
+        lc_map = AWSMinionManager.bulk_describe_launch_configurations(
+            self._ac_client, lc_names)
 
         for asg_meta in self._asg_metas:
             asg = asg_meta.asg_info
 
             # Get current launch configuration.
-            launch_config = _describe_launch_configuration()
+            launch_config = lc_map[asg.LaunchConfigurationName]
             asg_meta.set_lc_info(launch_config)
             bid_info = {}
             if "SpotPrice" in launch_config.keys():
@@ -173,15 +462,20 @@ class AWSMinionManager(MinionManagerBase):
                         launch_config.LaunchConfigurationName, bid_info)
 
     def log_k8s_event(self, asg_name, price="", useSpot=False):
-        msg_str = '{"apiVersion":"v1alpha1","spotPrice":"' + price + '", "useSpot": ' + str(useSpot).lower() + '}'
-        event_namespace = os.getenv('EVENT_NAMESPACE', 'default')
+        msg_str = json.dumps({"apiVersion": "v1alpha1", "spotPrice": price,
+                              "useSpot": bool(useSpot)})
         if not self.incluster:
             logger.info(msg_str)
             return
+        # Post the event from the event pool; update_needed calls this on
+        # every branch and shouldn't block on the apiserver.
+        self._event_executor.submit(self._post_k8s_event, asg_name, msg_str)
 
+    def _post_k8s_event(self, asg_name, msg_str):
+        """ Builds and POSTs the spot-instance-update event. """
+        event_namespace = os.getenv('EVENT_NAMESPACE', 'default')
         try:
-            config.load_incluster_config()
-            v1 = client.CoreV1Api()
+            v1 = self._get_k8s_api()
             event_timestamp = datetime.now(pytz.utc)
             event_name = "spot-instance-update"
             new_event = client.V1Event(
@@ -211,7 +505,7 @@ class AWSMinionManager(MinionManagerBase):
 
     def get_new_bid_info(self, asg_meta):
         """ get new bid price. """
-        new_bid_info = self.bid_advisor.get_new_bid(
+        new_bid_info = self._bid_cache.get_bid(
                         zones=asg_meta.asg_info.AvailabilityZones,
                         instance_type=asg_meta.lc_info.InstanceType)
         return new_bid_info
@@ -265,56 +559,48 @@ class AWSMinionManager(MinionManagerBase):
         """
         if cur_bid_info["type"] != new_bid_info["type"]:
             return False
-        # If you're here, it means that the bid types are equal.
-        if cur_bid_info["type"] == "on-demand":
-            return True
-
-        if cur_bid_info["price"] == new_bid_info["price"]:
-            return True
-
-        return False
+        # Same type: on-demand bids carry no meaningful price, spot bids
+        # are equal iff the prices match.
+        return cur_bid_info["type"] == "on-demand" or \
+            cur_bid_info.get("price") == new_bid_info.get("price")
 
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-    def create_lc_with_spot(self, new_lc_name, launch_config, spot_price):
-        """ Creates a launch-config for using spot-instances. """
+    def _create_launch_configuration(self, new_lc_name, launch_config,
+                                     spot_price=None, user_data=None):
+        """
+        Creates a launch-config from the given one, optionally with a
+        spot price. The kwargs are built once; AssociatePublicIpAddress
+        and SpotPrice are added only when applicable. 'user_data' takes
+        the already-decoded UserData so it isn't re-decoded per call.
+        """
         try:
+            if user_data is None:
+                user_data = base64.b64decode(launch_config.UserData)
+            kwargs = dict(
+                LaunchConfigurationName=new_lc_name,
+                ImageId=launch_config.ImageId,
+                KeyName=launch_config.KeyName,
+                SecurityGroups=launch_config.SecurityGroups,
+                ClassicLinkVPCSecurityGroups=launch_config.
+                ClassicLinkVPCSecurityGroups,
+                UserData=user_data,
+                InstanceType=launch_config.InstanceType,
+                BlockDeviceMappings=launch_config.BlockDeviceMappings,
+                InstanceMonitoring=launch_config.InstanceMonitoring,
+                IamInstanceProfile=launch_config.IamInstanceProfile,
+                EbsOptimized=launch_config.EbsOptimized)
             if hasattr(launch_config, "AssociatePublicIpAddress"):
-                response = self._ac_client.create_launch_configuration(
-                    LaunchConfigurationName=new_lc_name,
-                    ImageId=launch_config.ImageId,
-                    KeyName=launch_config.KeyName,
-                    SecurityGroups=launch_config.SecurityGroups,
-                    ClassicLinkVPCSecurityGroups=launch_config.
-                    ClassicLinkVPCSecurityGroups,
-                    UserData=base64.b64decode(launch_config.UserData),
-                    InstanceType=launch_config.InstanceType,
-                    BlockDeviceMappings=launch_config.BlockDeviceMappings,
-                    InstanceMonitoring=launch_config.InstanceMonitoring,
-                    SpotPrice=spot_price,
-                    IamInstanceProfile=launch_config.IamInstanceProfile,
-                    EbsOptimized=launch_config.EbsOptimized,
-                    AssociatePublicIpAddress=launch_config.
-                    AssociatePublicIpAddress)
-            else:
-                response = self._ac_client.create_launch_configuration(
-                    LaunchConfigurationName=new_lc_name,
-                    ImageId=launch_config.ImageId,
-                    KeyName=launch_config.KeyName,
-                    SecurityGroups=launch_config.SecurityGroups,
-                    ClassicLinkVPCSecurityGroups=launch_config.
-                    ClassicLinkVPCSecurityGroups,
-                    UserData=base64.b64decode(launch_config.UserData),
-                    InstanceType=launch_config.InstanceType,
-                    BlockDeviceMappings=launch_config.BlockDeviceMappings,
-                    InstanceMonitoring=launch_config.InstanceMonitoring,
-                    SpotPrice=spot_price,
-                    IamInstanceProfile=launch_config.IamInstanceProfile,
-                    EbsOptimized=launch_config.EbsOptimized)				
+                kwargs['AssociatePublicIpAddress'] = \
+                    launch_config.AssociatePublicIpAddress
+            if spot_price is not None:
+                kwargs['SpotPrice'] = spot_price
+            response = self._ac_client.create_launch_configuration(**kwargs)
             assert response is not None, \
                 "Failed to create launch-config {}".format(new_lc_name)
             assert response["HTTPStatusCode"] == 200, \
                 "Failed to create launch-config {}".format(new_lc_name)
-            logger.info("Created LaunchConfig for spot instances: %s",
+            logger.info("Created LaunchConfig for %s instances: %s",
+                        "spot" if spot_price is not None else "on-demand",
                         new_lc_name)
         except ClientError as ce:
             if "AlreadyExists" in str(ce):
@@ -323,52 +609,17 @@ class AWSMinionManager(MinionManagerBase):
                 return
             raise ce
 
-    @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
-    def create_lc_on_demand(self, new_lc_name, launch_config):
+    def create_lc_with_spot(self, new_lc_name, launch_config, spot_price,
+                            user_data=None):
+        """ Creates a launch-config for using spot-instances. """
+        self._create_launch_configuration(new_lc_name, launch_config,
+                                          spot_price, user_data)
+
+    def create_lc_on_demand(self, new_lc_name, launch_config,
+                            user_data=None):
         """ Creates a launch-config for using on-demand instances. """
-        try:
-            if hasattr(launch_config, "AssociatePublicIpAddress"):
-                response = self._ac_client.create_launch_configuration(
-                    LaunchConfigurationName=new_lc_name,
-                    ImageId=launch_config.ImageId,
-                    KeyName=launch_config.KeyName,
-                    SecurityGroups=launch_config.SecurityGroups,
-                    ClassicLinkVPCSecurityGroups=launch_config.
-                    ClassicLinkVPCSecurityGroups,
-                    UserData=base64.b64decode(launch_config.UserData),
-                    InstanceType=launch_config.InstanceType,
-                    BlockDeviceMappings=launch_config.BlockDeviceMappings,
-                    InstanceMonitoring=launch_config.InstanceMonitoring,
-                    IamInstanceProfile=launch_config.IamInstanceProfile,
-                    EbsOptimized=launch_config.EbsOptimized,
-                    AssociatePublicIpAddress=launch_config.
-                    AssociatePublicIpAddress)
-            else:
-                response = self._ac_client.create_launch_configuration(
-                    LaunchConfigurationName=new_lc_name,
-                    ImageId=launch_config.ImageId,
-                    KeyName=launch_config.KeyName,
-                    SecurityGroups=launch_config.SecurityGroups,
-                    ClassicLinkVPCSecurityGroups=launch_config.
-                    ClassicLinkVPCSecurityGroups,
-                    UserData=base64.b64decode(launch_config.UserData),
-                    InstanceType=launch_config.InstanceType,
-                    BlockDeviceMappings=launch_config.BlockDeviceMappings,
-                    InstanceMonitoring=launch_config.InstanceMonitoring,
-                    IamInstanceProfile=launch_config.IamInstanceProfile,
-                    EbsOptimized=launch_config.EbsOptimized)
-            assert response is not None, \
-                "Failed to create launch-config {}".format(new_lc_name)
-            assert response["HTTPStatusCode"] == 200, \
-                "Failed to create launch-config {}".format(new_lc_name)
-            logger.info("Created LaunchConfig for on-demand instances: %s",
-                        new_lc_name)
-        except ClientError as ce:
-            if "AlreadyExists" in str(ce):
-                logger.info("LaunchConfig %s already exists. Reusing it.",
-                            new_lc_name)
-                return
-            raise ce
+        self._create_launch_configuration(new_lc_name, launch_config,
+                                          user_data=user_data)
 
     def update_scaling_group(self, asg_meta, new_bid_info):
         """
@@ -400,10 +651,13 @@ class AWSMinionManager(MinionManagerBase):
         logger.info("ASG(%s): New launch-config name: %s",
                     asg_meta.get_name(), new_lc_name)
 
+        user_data = asg_meta.get_user_data_decoded()
         if spot_price is None:
-            self.create_lc_on_demand(new_lc_name, launch_config)
+            self.create_lc_on_demand(new_lc_name, launch_config,
+                                     user_data=user_data)
         else:
-            self.create_lc_with_spot(new_lc_name, launch_config, spot_price)
+            self.create_lc_with_spot(new_lc_name, launch_config, spot_price,
+                                     user_data=user_data)
 
         @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
         def _update_asg_in_aws(asg_name, launch_config_name):
@@ -442,47 +696,123 @@ class AWSMinionManager(MinionManagerBase):
         Wating for all instances in ASG to be running state.
         """
         asg_name = asg_meta.get_name()
-        all_done = False
-        while not all_done:
+        # Poll with exponential backoff (5s -> 60s) instead of a fixed
+        # 60s sleep: instances that come up quickly are noticed quickly,
+        # and long waits still back off to one Describe call per minute.
+        delay = 5
+        while True:
             resp = self._ac_client.describe_auto_scaling_groups(
                 AutoScalingGroupNames=[asg_name])
             desired_instances = resp["AutoScalingGroups"][0]["DesiredCapacity"]
-            running_instances = 0
-            for i in resp["AutoScalingGroups"][0]["Instances"]:
-                if i["HealthStatus"] == "Healthy":
-                    running_instances += 1
+            running_instances = sum(
+                1 for i in resp["AutoScalingGroups"][0]["Instances"]
+                if i["HealthStatus"] == "Healthy")
 
             if running_instances == desired_instances:
                 logger.info("ASG %s has all running instances", asg_name)
-                all_done = True
-            else:
-                logger.info("Desired %s, Running %s",
-                            desired_instances, running_instances)
-                all_done = False
-                time.sleep(60)
+                return
+            logger.info("Desired %s, Running %s",
+                        desired_instances, running_instances)
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def _get_k8s_api(self):
+        """ Returns a cached CoreV1Api client, loading the in-cluster
+        config only on first use. """
+        if self._k8s_api is None:
+            config.load_incluster_config()
+            self._k8s_api = client.CoreV1Api()
+        return self._k8s_api
+
+    def _get_node_map(self):
+        """
+        Returns a map of instance-id -> k8s node name, rebuilt from a
+        single list_node call at most every 30 seconds. This avoids one
+        full node listing (and an O(nodes) scan) per terminated instance.
+        """
+        now = time.time()
+        if now < self._node_map_expiry:
+            return self._instance_to_node
+        node_map = {}
+        for item in self._get_k8s_api().list_node().items:
+            match = _PROVIDER_ID_RE.search(item.spec.provider_id or '')
+            if match:
+                node_map[match.group(0)] = item.metadata.name
+        self._instance_to_node = node_map
+        self._node_map_expiry = now + 30
+        return self._instance_to_node
+
+    def _wait_for_instance_termination(self, asg_meta, instance_id,
+                                       max_attempts=36):
+        """
+        Polls until the terminated instance has left the ASG, backing
+        off exponentially (5s -> 30s). Replaces a flat 180s sleep that
+        parked a worker thread for three minutes per termination even
+        when AWS was done in seconds.
+        """
+        asg_name = asg_meta.get_name()
+        delay = 5
+        for _ in range(max_attempts):
+            resp = self._ac_client.describe_auto_scaling_groups(
+                AutoScalingGroupNames=[asg_name])
+            instance_ids = [i['InstanceId'] for i in
+                            resp['AutoScalingGroups'][0]['Instances']]
+            if instance_id not in instance_ids:
+                logger.info("Instance %s no longer in ASG %s",
+                            instance_id, asg_name)
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+        logger.info("Instance %s still in ASG %s after %d checks",
+                    instance_id, asg_name, max_attempts)
 
     def get_name_for_instance(self, instance):
-        config.load_incluster_config()
-        v1 = client.CoreV1Api()
-        for item in v1.list_node().items:
-            if instance.InstanceId in item.spec.provider_id:
-                logger.info("Instance name for %s in Kubernetes clusters is %s",
-                    instance.InstanceId, item.metadata.name)
-                return item.metadata.name
-        return None
+        name = self._get_node_map().get(instance.InstanceId)
+        if name:
+            logger.info("Instance name for %s in Kubernetes clusters is %s",
+                instance.InstanceId, name)
+        return name
+
+    def evict_pods_from_node(self, node_name):
+        """ Evicts all evictable pods from the given node in parallel. """
+        v1 = self._get_k8s_api()
+        pods = v1.list_pod_for_all_namespaces(
+            field_selector="spec.nodeName=" + node_name)
+        futures = []
+        for pod in pods.items:
+            # DaemonSet pods come right back after eviction; skip them the
+            # way 'kubectl drain --ignore-daemonsets' does.
+            owners = pod.metadata.owner_references or []
+            if any(ref.kind == "DaemonSet" for ref in owners):
+                continue
+            body = client.V1beta1Eviction(
+                metadata=client.V1ObjectMeta(
+                    name=pod.metadata.name,
+                    namespace=pod.metadata.namespace))
+            # Evictions go through the ASG pool: run_or_die already holds a
+            # termination-pool worker, so waiting on termination-pool
+            # futures here could deadlock.
+            futures.append(self._asg_executor.submit(
+                v1.create_namespaced_pod_eviction,
+                name=pod.metadata.name,
+                namespace=pod.metadata.namespace, body=body))
+        for future in futures:
+            future.result()
 
     def cordon_node(self, instance):
-        """" Runs 'kubectl drain' to actually drain the node."""
+        """ Cordons the node and drains it via the Eviction API. """
         instance_name = self.get_name_for_instance(instance)
         if instance_name:
+            v1 = self._get_k8s_api()
             try:
-                cmd = "kubectl drain " + instance_name + " --ignore-daemonsets=true --delete-local-data=true --force --grace-period=-1"
-                subprocess.check_call(shlex.split(cmd))
+                v1.patch_node(instance_name,
+                              {'spec': {'unschedulable': True}})
+                self.evict_pods_from_node(instance_name)
                 logger.info("Drained instance %s", instance_name)
             except Exception as ex:
                 logger.info("Failed to drain node: " + str(ex) + ". Will try to uncordon")
-                cmd = "kubectl uncordon " + instance_name
-                subprocess.check_call(shlex.split(cmd))
+                v1.patch_node(instance_name,
+                              {'spec': {'unschedulable': False}})
                 logger.info("Uncordoned node " + instance_name)
         else:
             logger.info("Instance %s not found in Kubernetes cluster. Will not drain the instance.",
@@ -493,7 +823,7 @@ class AWSMinionManager(MinionManagerBase):
     def run_or_die(self, instance, asg_meta, asg_semaphore):
         """ Terminates the given instance. """
         zones = asg_meta.asg_info.AvailabilityZones
-        bid_info = self.bid_advisor.get_new_bid(zones, instance.InstanceType)
+        bid_info = self._bid_cache.get_bid(zones, instance.InstanceType)
         is_spot_instance = 'InstanceLifecycle' in instance
         is_on_demand_instance = not is_spot_instance
         with asg_semaphore:
@@ -526,14 +856,15 @@ class AWSMinionManager(MinionManagerBase):
                 logger.info("Terminated instance %s", instance.InstanceId)
                 asg_meta.remove_instance(instance.InstanceId)
                 logger.info("Removed instance %s from ASG %s", instance.InstanceId, asg_meta.get_name())
-                logger.info("Sleeping 180s before checking ASG")
-                time.sleep(180)
+                self._wait_for_instance_termination(asg_meta,
+                                                    instance.InstanceId)
                 self.wait_for_all_running(asg_meta)
                 return True
             except Exception as ex:
                 logger.error("Failed in run_or_die: %s", str(ex))
             finally:
-                self.on_demand_kill_threads.pop(instance.InstanceId, None)
+                with self._scheduled_lock:
+                    self.on_demand_kill_threads.pop(instance.InstanceId, None)
 
     def set_semaphore(self, asg_meta):
         """
@@ -579,6 +910,10 @@ class AWSMinionManager(MinionManagerBase):
         # Setting Semaphore per ASG base on instance count and terminate_percentage
         asg_semaphore = self.set_semaphore(asg_meta)
 
+        # One timestamp for the whole pass; the per-instance elapsed time
+        # doesn't need a fresh clock read on every iteration.
+        current_time = datetime.now(pytz.utc)
+
         for instance in instances:
             # On-demand instances don't have the InstanceLifecycle field in
             # their responses. Spot instances have InstanceLifecycle=spot.
@@ -598,7 +933,6 @@ class AWSMinionManager(MinionManagerBase):
                 continue
 
             launch_time = instance.LaunchTime
-            current_time = datetime.utcnow().replace(tzinfo=pytz.utc)
             elapsed_seconds = (current_time - launch_time). \
                 total_seconds()
 
@@ -618,38 +952,28 @@ class AWSMinionManager(MinionManagerBase):
             # TODO: Make this time configurable!
             seconds_before_check = 10
             instance_id = instance.InstanceId
-            if instance_id in self.on_demand_kill_threads.keys():
+            with self._scheduled_lock:
+                already_scheduled = instance_id in self.on_demand_kill_threads
+            if already_scheduled:
                 continue
 
-            logger.info("Scheduling termination thread for %s (%s) in ASG %s (%s) after %s seconds",
+            logger.info("Scheduling termination of %s (%s) in ASG %s (%s) after %s seconds",
                         asg_meta.get_instance_name(instance), instance_id, asg_meta.get_name(), asg_tag, seconds_before_check)
-            args = [instance, asg_meta, asg_semaphore]
-            timed_thread = Timer(seconds_before_check, self.run_or_die,
-                                    args=args)
-            timed_thread.setDaemon(True)
-            timed_thread.start()
-            self.on_demand_kill_threads[instance_id] = timed_thread
+            future = self._term_executor.submit(
+                self._delayed_run_or_die, seconds_before_check, instance,
+                asg_meta, asg_semaphore)
+            with self._scheduled_lock:
+                self.on_demand_kill_threads[instance_id] = future
         return
 
+    def _delayed_run_or_die(self, delay, instance, asg_meta, asg_semaphore):
+        """ Waits for 'delay' seconds and then runs run_or_die. """
+        time.sleep(delay)
+        return self.run_or_die(instance, asg_meta, asg_semaphore)
+
     def populate_instances(self, asg_meta):
         """ Populates info about all instances running in the given ASG. """
-        response = AWSMinionManager.describe_asg_with_retries(
-            self._ac_client, [asg_meta.get_name()])
-        instance_ids = []
-        asg = response.AutoScalingGroups[0]
-        for instance in asg.Instances:
-            instance_ids.append(instance.InstanceId)
-
-        if len(instance_ids) <= 0:
-            return
-
-        response = self.get_instances_with_retries(self._ec2_client, instance_ids)
-        running_instances = []
-        for resv in response.Reservations:
-            for instance in resv.Instances:
-                if asg_meta.is_instance_running(instance):
-                    running_instances.append(instance)
-        asg_meta.add_instances(running_instances)
+        asg_meta.refresh_instances(self._ec2_client, self._instance_batcher)
 
     def minion_manager_work(self):
         """ The main work for dealing with spot-instances happens here. """
@@ -658,65 +982,109 @@ class AWSMinionManager(MinionManagerBase):
             logger.info("Only logging events\n")
         while True:
             try:
-                # Iterate over all asgs and update them if needed.
-                for asg_meta in self._asg_metas:
-                    # Populate info. about all instances in the ASG
-                    self.populate_instances(asg_meta)
-
-                    # Check if any of these are instances that need to be terminated.
-                    self.schedule_instance_termination(asg_meta)
-
-                    if not self.update_needed(asg_meta):
-                        continue
-
-                    # Some update is needed. This can mean:
-                    # 1. The desired # of instances are not running
-                    # 2. The ASG tag and the type of running instances do not match.
-                    # 3.
-                    bid_info = asg_meta.get_bid_info()
-                    if asg_meta.get_mm_tag() == "no-spot" and bid_info["type"] == "spot":
-                        new_bid_info = self.create_on_demand_bid_info()
-                        logger.info("ASG %s configured with no-spot but currently using spot. Updating...", asg_meta.get_name())
-                        self.update_scaling_group(asg_meta, new_bid_info)
-                        continue
-
-                    new_bid_info = self.get_new_bid_info(asg_meta)
-                    
-                    # Change ASG to on-demand if insufficient capacity
-                    if self.check_insufficient_capacity(asg_meta):
-                        new_bid_info = self.create_on_demand_bid_info()
-                        logger.info("ASG %s spot instance have not sufficient resource. Updating to on-demand...", asg_meta.get_name())
-                        self.update_scaling_group(asg_meta, new_bid_info)
-                        continue
-
-                    # Update ASGs iff new bid is different from current bid.
-                    if self.are_bids_equal(asg_meta.bid_info, new_bid_info):
-                        logger.info("No change in bid info for %s",
-                                   asg_meta.get_name())
-                        continue
-                    logger.info("Got new bid info from BidAdvisor: %s", new_bid_info)
-
-                    self.update_scaling_group(asg_meta, new_bid_info)
+                # Refresh the ASG info of all ASGs with batched calls instead
+                # of one describe_auto_scaling_groups call per ASG.
+                asg_names = [m.get_name() for m in self._asg_metas]
+                if asg_names:
+                    asg_map = AWSMinionManager.bulk_describe_asgs(
+                        self._ac_client, asg_names)
+                    for asg_meta in self._asg_metas:
+                        asg_info = asg_map.get(asg_meta.get_name())
+                        if asg_info:
+                            asg_meta.set_asg_info(asg_info)
+
+                # Reconcile all ASGs in parallel; each is I/O-bound on
+                # AWS, so the pass costs roughly the slowest ASG instead
+                # of the sum over all of them.
+                futures = [(asg_meta,
+                            self._asg_executor.submit(self._reconcile_asg,
+                                                      asg_meta))
+                           for asg_meta in self._asg_metas]
+                for asg_meta, future in futures:
+                    try:
+                        future.result()
+                    except Exception as ex:
+                        logger.error("Failed while reconciling ASG %s: %s",
+                                     asg_meta.get_name(), str(ex))
             except Exception as ex:
                 logger.exception("Failed while checking instances in ASG: " +
                                  str(ex))
             finally:
                 # Cooling off period. TODO: Make this configurable!
-                time.sleep(self._refresh_interval_seconds)
+                # Waiting on the stop event instead of sleeping makes
+                # the loop responsive to shutdown().
+                if self._stop_event.wait(self._refresh_interval_seconds):
+                    return
 
                 try:
-                    # Discover and populate the correct ASGs.
-                    del self._asg_metas[:]
-                    self.discover_asgs()
-                    self.populate_current_config()
+                    # Re-discover and rebuild the ASG metas only when
+                    # the discovered set actually changed; in the
+                    # common steady state the fingerprint matches and
+                    # the metas (refreshed in place at the top of the
+                    # loop) are kept as-is.
+                    response = self._discover_asgs_cached()
+                    fingerprint = self._discovery_fingerprint(response)
+                    if fingerprint != self._last_discovery_fingerprint:
+                        del self._asg_metas[:]
+                        self.discover_asgs()
+                        self.populate_current_config()
                 except Exception as ex:
                     raise Exception("Failed to discover/populate current ASG info: " + str(ex))
 
+    def _reconcile_asg(self, asg_meta):
+        """ Runs one ASG's instance refresh, termination scheduling and
+        bid updates as one pipeline. """
+        # Refreshing here instead of in a separate all-ASG pass removes
+        # a synchronization barrier from the cycle; the describe calls
+        # of concurrently reconciling ASGs still coalesce in the
+        # instance batcher.
+        self.populate_instances(asg_meta)
+
+        # Check if any of these are instances that need to be terminated.
+        self.schedule_instance_termination(asg_meta)
+
+        if not self.update_needed(asg_meta):
+            return
+
+        # Some update is needed. This can mean:
+        # 1. The desired # of instances are not running
+        # 2. The ASG tag and the type of running instances do not match.
+        # 3.
+        bid_info = asg_meta.get_bid_info()
+        if asg_meta.get_mm_tag() == "no-spot" and bid_info["type"] == "spot":
+            new_bid_info = self.create_on_demand_bid_info()
+            logger.info("ASG %s configured with no-spot but currently using spot. Updating...", asg_meta.get_name())
+            self.update_scaling_group(asg_meta, new_bid_info)
+            return
+
+        new_bid_info = self.get_new_bid_info(asg_meta)
+
+        # Change ASG to on-demand if insufficient capacity. The check
+        # only matters while the current launch-config is spot — an
+        # on-demand ASG has no pending spot requests to inspect — and
+        # only when the new recommendation keeps us on spot: if the
+        # advisor already says on-demand, the ordinary update below
+        # lands on the same launch-config, so the activities round-trip
+        # would be pure waste.
+        if bid_info["type"] == "spot" and \
+                new_bid_info["type"] == "spot" and \
+                self.check_insufficient_capacity(asg_meta):
+            new_bid_info = self.create_on_demand_bid_info()
+            logger.info("ASG %s spot instance have not sufficient resource. Updating to on-demand...", asg_meta.get_name())
+            self.update_scaling_group(asg_meta, new_bid_info)
+            return
+
+        # Update ASGs iff new bid is different from current bid.
+        if self.are_bids_equal(asg_meta.bid_info, new_bid_info):
+            logger.info("No change in bid info for %s",
+                        asg_meta.get_name())
+            return
+        logger.info("Got new bid info from BidAdvisor: %s", new_bid_info)
+
+        self.update_scaling_group(asg_meta, new_bid_info)
+
     def create_on_demand_bid_info(self):
-        new_bid_info = {}
-        new_bid_info["type"] = "on-demand"
-        new_bid_info["price"] = ""
-        return new_bid_info
+        return dict(_ON_DEMAND_BID)
 
     def run(self):
         """Entrypoint for the AWS specific minion-manager."""
@@ -737,20 +1105,30 @@ class AWSMinionManager(MinionManagerBase):
         self.minion_manager_work()
         return
 
+    def shutdown(self):
+        """ Stops the main loop and the bid-advisor threads. """
+        self._stop_event.set()
+        self.bid_advisor.shutdown()
+
+    # Total time to wait for an ASG's desired and actual instance
+    # counts to converge before giving up.
+    CONVERGENCE_DEADLINE_SECONDS = 90
+
     def check_scaling_group_instances(self, scaling_group):
         """
         Checks whether desired number of instances are running in an ASG.
         Also, schedules termination of "on-demand" instances.
         """
         asg_meta = scaling_group
-        attempts_to_converge = 3
-        while attempts_to_converge > 0:
-            asg_info = asg_meta.get_asg_info()
+        asg_info = asg_meta.get_asg_info()
+        deadline = time.time() + self.CONVERGENCE_DEADLINE_SECONDS
+        backoff = 2
+        while True:
             response = AWSMinionManager.describe_asg_with_retries(
                 self._ac_client, [asg_info.AutoScalingGroupName])
-            asg = response.AutoScalingGroups[0]
+            asg = response['AutoScalingGroups'][0]
 
-            if asg.DesiredCapacity <= len(asg.Instances):
+            if asg['DesiredCapacity'] <= len(asg['Instances']):
                 # The DesiredCapacity can be <= actual number of instances.
                 # This can happen during scale down. The autoscaler may have
                 # reduced the DesiredCapacity. But it can take sometime before
@@ -758,65 +1136,71 @@ class AWSMinionManager(MinionManagerBase):
                 # during that time, the DesiredCapacity may be < actual number
                 # of instances.
                 return True
-            else:
-                # It is possible that the autoscaler may have just increased
-                # the DesiredCapacity but AWS is still in the process of
-                # spinning up new instances. To given enough time to AWS to
-                # spin up these new instances (i.e. for the desired state and
-                # actual state to converge), sleep for 1 minute and try again.
-                # If the state doesn't converge even after retries, return
-                # False.
-                logger.info("Desired number of instances not running in asg %s." +
-                            "Desired %d, actual %d", asg_meta.get_name(), asg.DesiredCapacity,
-                            len(asg.Instances))
-                attempts_to_converge = attempts_to_converge - 1
-
-                # Wait for sometime before checking again.
-                time.sleep(60)
-        return False
+
+            # It is possible that the autoscaler may have just increased
+            # the DesiredCapacity but AWS is still in the process of
+            # spinning up new instances. Poll with exponential backoff
+            # (2s -> 30s) to give the desired and actual state time to
+            # converge; convergence usually happens well inside a minute,
+            # so the old flat 60s sleeps mostly overshot.
+            logger.info("Desired number of instances not running in asg %s." +
+                        "Desired %d, actual %d", asg_meta.get_name(), asg['DesiredCapacity'],
+                        len(asg['Instances']))
+            if time.time() >= deadline:
+                return False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+            # Drop the cached describe so the next poll sees fresh state.
+            DESCRIBE_CACHE.invalidate(asg_info.AutoScalingGroupName)
     
     def check_insufficient_capacity(self, scaling_group):
         """
         Checks whether not completed ASG activities got not have sufficient capacity error message.
         """
-        # This error message from https://docs.aws.amazon.com/autoscaling/ec2/userguide/ts-as-capacity.html#ts-as-capacity-1
-        INSUFFICIENT_CAPACITY_MESSAGE = ['We currently do not have sufficient',
-                                           'capacity in the Availability Zone you requested']
-        
-        WAITING_SPOT_INSTANCE_MESSAGE = ['Placed Spot instance request:', 'Waiting for instance(s)']
-        
         asg_info = scaling_group.get_asg_info()
+        asg_name = asg_info.AutoScalingGroupName
         response = AWSMinionManager.describe_asg_activities_with_retries(
-            self._ac_client, asg_info.AutoScalingGroupName)
-        activities = response.Activities
-        
+            self._ac_client, asg_name,
+            self._last_activity_id.get(asg_name))
+        activities = response['Activities']
+
+        # Only advance the marker past fully-completed activities;
+        # in-progress ones must be re-examined on the next poll.
+        if activities and all(a['Progress'] == 100 for a in activities):
+            newest_id = activities[0].get('ActivityId')
+            if newest_id:
+                self._last_activity_id[asg_name] = newest_id
+
         for activity in activities:
-            if activity.Progress == 100:
+            if activity['Progress'] == 100:
+                # Activities are newest-first; once a completed one is
+                # reached, everything after it is older history.
+                break
+            msg = activity.get('StatusMessage')
+            if not msg:
                 continue
-            if 'StatusMessage' in activity and len([message for message in INSUFFICIENT_CAPACITY_MESSAGE if message in activity.StatusMessage]) == len(INSUFFICIENT_CAPACITY_MESSAGE):
+            if all(message in msg for message in INSUFFICIENT_CAPACITY_MESSAGE):
                 return True
-            
+
             # Check spot request status code
-            if 'StatusMessage' in activity and len([message for message in WAITING_SPOT_INSTANCE_MESSAGE if message in activity.StatusMessage]) == len(WAITING_SPOT_INSTANCE_MESSAGE):
-                spot_req_regex = re.compile('Placed Spot instance request: (?P<spot_req_id>sir-[a-zA-Z0-9]+)\. Waiting for instance\(s\)')
-                spot_req_re_result = spot_req_regex.search(activity.StatusMessage)
+            if all(message in msg for message in WAITING_SPOT_INSTANCE_MESSAGE):
+                spot_req_re_result = _SPOT_REQ_RE.search(msg)
                 if spot_req_re_result is not None and \
                         self.check_spot_request_insufficient_capacity(spot_req_re_result.group('spot_req_id')):
                     return True
-            
+
         return False
     
     def check_spot_request_insufficient_capacity(self, spot_request):
         OVERSUBSCRIBED_MESSAGE = 'capacity-oversubscribed'
         CAPACITY_NOT_AVAILABLE = 'capacity-not-available'
         
-        response = AWSMinionManager.describe_spot_request_with_retries(self._ec2_client, [spot_request])
-        requests = response.SpotInstanceRequests
-        for request in requests:
-            if 'Status' in request and 'Code' in request.Status:
-                if OVERSUBSCRIBED_MESSAGE == request.Status.Code or CAPACITY_NOT_AVAILABLE == request.Status.Code:
-                    return True
-                
+        response = self.describe_spot_request_with_retries(self._ec2_client, [spot_request])
+        for request in response['SpotInstanceRequests']:
+            code = (request.get('Status') or {}).get('Code')
+            if code == OVERSUBSCRIBED_MESSAGE or code == CAPACITY_NOT_AVAILABLE:
+                return True
+
         return False
         
     def get_asg_metas(self):
@@ -3,8 +3,6 @@
 import unittest
 import mock
 import pytest
-import subprocess
-import shlex
 from cloud_provider.aws.aws_minion_manager import AWSMinionManager
 from cloud_provider.aws.aws_bid_advisor import AWSBidAdvisor
 from moto import mock_autoscaling, mock_sts, mock_ec2
@@ -341,12 +339,12 @@ class AWSMinionManagerTest(unittest.TestCase):
     @mock_autoscaling
     @mock_ec2
     @mock_sts
-    @mock.patch.object(AWSBidAdvisor, 'get_spot_instance_price')
-    def test_price_reporter_basic(self, get_spot_instance_price_mock):
+    @mock.patch.object(AWSBidAdvisor, 'get_on_demand_price')
+    def test_price_reporter_basic(self, get_on_demand_price_mock):
         """
         Tests that the PriceReporter populates the pricing info.
         """
-        get_spot_instance_price_mock.return_value = "0.100"
+        get_on_demand_price_mock.return_value = 0.100
 
         awsmm = self.basic_setup_and_test()
         asg_meta = awsmm.get_asg_metas()[0]
@@ -357,11 +355,14 @@ class AWSMinionManagerTest(unittest.TestCase):
         awsmm.price_reporter.price_reporter_work()
         assert len(awsmm.price_reporter.price_info) == \
             len(asg_meta.get_instances())
-        # Call price_reporter_work again. There should now be two values.
+        # Call price_reporter_work again. The instance's ring should now
+        # hold two datapoints.
         awsmm.price_reporter.price_reporter_work()
         instance = asg_meta.get_instances()[0]
-        assert len(awsmm.price_reporter.price_info[
-            instance.InstanceId]) == 2
+        ring = awsmm.price_reporter.price_info[instance.InstanceId]
+        pairs = awsmm.price_reporter.ring_to_pairs(ring)
+        assert len(pairs) == 2
+        assert all(price == 0.100 for _, price in pairs)
 
     # Setting semaphore Value
     @mock_autoscaling
@@ -383,21 +384,24 @@ class AWSMinionManagerTest(unittest.TestCase):
         _semaphore_helper('use-spot', 60, 2)
         _semaphore_helper('use-spot', 100, 3)
 
-    @mock.patch('subprocess.check_call')
+    @mock.patch('cloud_provider.aws.aws_minion_manager.AWSMinionManager._get_k8s_api')
     @mock.patch('cloud_provider.aws.aws_minion_manager.AWSMinionManager.get_name_for_instance')
     @mock_autoscaling
     @mock_ec2
     @mock_sts
-    def test_cordon(self, mock_get_name_for_instance, mock_check_call):
+    def test_cordon(self, mock_get_name_for_instance, mock_get_k8s_api):
         awsmm = self.basic_setup_and_test()
         mock_get_name_for_instance.return_value = "ip-of-fake-node-name"
+        mock_v1 = mock_get_k8s_api.return_value
+        mock_v1.list_pod_for_all_namespaces.return_value = mock.MagicMock(items=[])
         awsmm.cordon_node("ip-of-fake-node")
-        mock_check_call.assert_called_with(['kubectl', 'drain', 'ip-of-fake-node-name',
-            '--ignore-daemonsets=true', '--delete-local-data=true', '--force', '--grace-period=-1'])
+        mock_v1.patch_node.assert_called_with('ip-of-fake-node-name',
+            {'spec': {'unschedulable': True}})
 
-        mock_check_call.side_effect = [Exception("Test"), True]
+        mock_v1.patch_node.side_effect = [Exception("Test"), None]
         awsmm.cordon_node("ip-of-fake-node")
-        mock_check_call.assert_called_with(['kubectl', 'uncordon', 'ip-of-fake-node-name'])
+        mock_v1.patch_node.assert_called_with('ip-of-fake-node-name',
+            {'spec': {'unschedulable': False}})
 
     @mock.patch('cloud_provider.aws.aws_minion_manager.AWSMinionManager.describe_asg_activities_with_retries')
     @mock_autoscaling
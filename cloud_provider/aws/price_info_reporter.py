@@ -3,14 +3,21 @@
 import sys
 import logging
 import time
-from threading import Thread
-from datetime import datetime
-from collections import deque
+from threading import Event, Lock, Thread
+from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # orjson encodes the price-info payload several times faster than
+    # the stdlib and never sorts keys or pretty-prints. Fall back to
+    # stdlib json where it isn't available (e.g. on Python 2).
+    import orjson as _json
+except ImportError:
+    import json as _json
 
-from bunch import bunchify
 from retrying import retry
 from constants import SECONDS_PER_MINUTE
-from flask import Flask, jsonify
 
 logger = logging.getLogger("aws_minion_manager")
 logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s " +
@@ -20,13 +27,19 @@ logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s " +
 logging.getLogger('boto3').setLevel(logging.WARNING)
 logging.getLogger('botocore').setLevel(logging.WARNING)
 
+# Number of datapoints kept per instance (one per cycle).
+PRICE_HISTORY_LEN = 24
+
 
 class AWSPriceReporter(object):
     """
     This class keeps track of the pricing info. of each running AWS instance
     in the ASG.
     """
-    # ec2_client is the boto ec2 client.
+    # ec2_client is the boto ec2 client. It is the process-wide client
+    # from shared_boto3_client, whose Config enlarges the connection pool
+    # so the fetch threads reuse warm connections instead of paying a TLS
+    # handshake per call.
     ec2_client = None
 
     # bid_advisor is the AWSBidAdvisor object used for getting some price info.
@@ -43,14 +56,56 @@ class AWSPriceReporter(object):
     # The api_thread is the Thread that responds to REST endpoints.
     api_thread = None
 
-    # price_info is the dictionary about each instance and it's pricing
-    # info.
+    # price_info maps each instance-id to its price history, stored as
+    # two parallel arrays ('ts': unix seconds, 'px': float prices) plus
+    # a ring cursor 'i' and fill count 'n'. The columnar ring costs a
+    # few machine words per datapoint where a deque of single-entry
+    # dicts cost ~200 bytes each.
     price_info = {}
 
     def __init__(self, ec2_client, bid_advisor, asg_metas):
+        """
+        The ec2_client must be the shared boto3 client: it is used
+        concurrently from the fetch threads, and a per-reporter client
+        would lose the warm connection pool.
+        """
         self.ec2_client = ec2_client
         self.bid_advisor = bid_advisor
         self.asg_metas = asg_metas
+
+        # Signalled by stop() so the collector thread exits promptly
+        # instead of sleeping out its interval.
+        self._stop = Event()
+
+        # Serializes access to price_info between the collector thread,
+        # which inserts instances and appends datapoints, and the API
+        # threads, which snapshot it. Held only for dict/deque copies.
+        self._price_lock = Lock()
+
+        # The Flask app is built once here rather than inside the API
+        # thread so a thread restart can't construct a second app.
+        self.app = self._build_app()
+
+        # Prices barely move within an hour, so lookups are memoized per
+        # hour bucket: on-demand prices by instance-type, spot prices by
+        # (instance-type, AZ). Both caches are cleared when the hour rolls
+        # over so they never grow past one cycle's worth of entries.
+        self._od_price_cache = {}
+        self._spot_price_cache = {}
+        self._price_cache_bucket = None
+
+        # Maps instance-id -> (query-time bucket, price) for the spot
+        # path of get_instance_price. The query time is aligned to the
+        # instance's launch minute, so until the bucket rolls over EC2
+        # would return the same price anyway.
+        self._last_bucket = {}
+
+        # Pool for the per-group spot-price fetches. The work is entirely
+        # network-bound, so groups are fetched in parallel; the pool is
+        # kept below the boto3 client's connection-pool size so threads
+        # don't serialize on the HTTP adapter. Results are written into
+        # price_info only on the collector thread.
+        self._price_executor = ThreadPoolExecutor(max_workers=16)
         self.collector_thread = Thread(target=self.price_reporter_main,
                                        name="PriceReporter")
         self.collector_thread.setDaemon(True)
@@ -60,29 +115,54 @@ class AWSPriceReporter(object):
         self.api_thread.setDaemon(True)
 
     def get_price_info(self):
-        """ Returns the price_info dict. """
+        """ Returns the price_info dict of per-instance price rings. """
         return self.price_info
 
+    def _current_price_bucket(self):
+        """
+        Returns the current hour bucket, clearing the price caches when
+        the hour rolls over.
+        """
+        hour_bucket = int(time.time() // 3600)
+        if hour_bucket != self._price_cache_bucket:
+            self._od_price_cache.clear()
+            self._spot_price_cache.clear()
+            self._price_cache_bucket = hour_bucket
+        return hour_bucket
+
     @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
     def get_instance_price(self, instance):
         """
-        Given an Instance object, gets the price of that instance based on the
-        InstanceType, AZ and StartTime.
+        Given an Instance object, returns the price of that instance based
+        on the InstanceType, AZ and StartTime. Returns None when the price
+        isn't known.
         """
         current_time = datetime.now()
         if 'InstanceLifecycle' not in instance:
-            return {str(current_time): self.bid_advisor.get_on_demand_price(
-                instance.InstanceType)}
-
-        query_time = current_time
-        query_time = query_time.replace(minute=instance.LaunchTime.minute)
-        query_time = query_time.replace(second=instance.LaunchTime.second)
-        query_time = query_time.replace(
-            microsecond=instance.LaunchTime.microsecond)
-        if current_time.minute >= instance.LaunchTime.minute:
-            query_time = query_time.replace(hour=current_time.hour)
-        else:
-            query_time = query_time.replace(hour=current_time.hour - 1)
+            key = (instance.InstanceType, self._current_price_bucket())
+            price = self._od_price_cache.get(key)
+            if price is None:
+                price = self.bid_advisor.get_on_demand_price(
+                    instance.InstanceType)
+                if price is not None:
+                    self._od_price_cache[key] = price
+            return price
+
+        launch_time = instance.LaunchTime
+        query_time = datetime(current_time.year, current_time.month,
+                              current_time.day, current_time.hour,
+                              launch_time.minute, launch_time.second,
+                              launch_time.microsecond,
+                              tzinfo=current_time.tzinfo)
+        if current_time.minute < launch_time.minute:
+            # The launch minute hasn't come around yet this hour; the
+            # subtraction also handles the day rolling back at midnight.
+            query_time -= timedelta(hours=1)
+
+        bucket = query_time.replace(microsecond=0)
+        cached = self._last_bucket.get(instance.InstanceId)
+        if cached is not None and cached[0] == bucket:
+            return cached[1]
 
         response = self.ec2_client.describe_spot_price_history(
             EndTime=query_time,
@@ -91,64 +171,238 @@ class AWSPriceReporter(object):
             AvailabilityZone=instance.Placement.AvailabilityZone,
             StartTime=query_time
         )
-        assert response is not None, "Failed to get spot-instance prices"
-        resp = bunchify(response)
-        if len(resp.SpotPriceHistory) > 0:
-            return {str(current_time): resp.SpotPriceHistory[0].SpotPrice}
+        history = response['SpotPriceHistory']
+        if history:
+            price = history[0]['SpotPrice']
+            self._last_bucket[instance.InstanceId] = (bucket, price)
+            return price
         else:
-            return {str(current_time): "-1"}
+            return "-1"
+
+    @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
+    def get_group_spot_price(self, instance_type, zone):
+        """
+        Returns the latest spot price for the given instance-type and
+        availability-zone with a single API call. All instances that share
+        the (type, zone) pair get the same price, so the price is queried
+        once per pair rather than once per instance.
+        """
+        current_time = datetime.now()
+        key = (instance_type, zone, self._current_price_bucket())
+        price = self._spot_price_cache.get(key)
+        if price is not None:
+            return price
+
+        response = self.ec2_client.describe_spot_price_history(
+            InstanceTypes=[instance_type],
+            ProductDescriptions=['Linux/UNIX (Amazon VPC)'],
+            AvailabilityZone=zone,
+            StartTime=current_time - timedelta(hours=1),
+            EndTime=current_time,
+            MaxResults=1
+        )
+        history = response['SpotPriceHistory']
+        if history:
+            price = history[0]['SpotPrice']
+            self._spot_price_cache[key] = price
+            return price
+        else:
+            return "-1"
+
+    @retry(wait_exponential_multiplier=1000, stop_max_attempt_number=3)
+    def get_all_spot_prices(self, instance_types):
+        """
+        Returns {(instance-type, AZ): price} for all the given instance
+        types across every AZ with a single API call. The history is
+        returned newest-first, so the first price seen per pair wins.
+        """
+        current_time = datetime.now()
+        response = self.ec2_client.describe_spot_price_history(
+            InstanceTypes=list(instance_types),
+            ProductDescriptions=['Linux/UNIX (Amazon VPC)'],
+            StartTime=current_time - timedelta(hours=1),
+            EndTime=current_time,
+            MaxResults=1000
+        )
+        prices = {}
+        for record in response['SpotPriceHistory']:
+            key = (record['InstanceType'], record['AvailabilityZone'])
+            if key not in prices:
+                prices[key] = record['SpotPrice']
+        return prices
+
+    def record_price(self, instance_id, price):
+        """
+        Appends a (now, price) datapoint to the instance's price ring.
+        """
+        with self._price_lock:
+            ring = self.price_info.get(instance_id)
+            if ring is None:
+                ring = {'ts': [0] * PRICE_HISTORY_LEN,
+                        'px': [0.0] * PRICE_HISTORY_LEN,
+                        'i': 0, 'n': 0}
+                self.price_info[instance_id] = ring
+            i = ring['i']
+            ring['ts'][i] = int(time.time())
+            ring['px'][i] = float(price)
+            ring['i'] = (i + 1) % PRICE_HISTORY_LEN
+            if ring['n'] < PRICE_HISTORY_LEN:
+                ring['n'] += 1
+
+    @staticmethod
+    def ring_to_pairs(ring):
+        """
+        Returns a ring's datapoints as oldest-first [timestamp, price]
+        pairs.
+        """
+        n = ring['n']
+        start = (ring['i'] - n) % PRICE_HISTORY_LEN
+        ts, px = ring['ts'], ring['px']
+        return [[ts[j], px[j]]
+                for j in ((start + k) % PRICE_HISTORY_LEN
+                          for k in range(n))]
 
     def price_reporter_work(self):
         """
         Performs one price check and updates the price_info.
+
+        All spot prices are fetched with one bulk query across the
+        distinct instance types; (type, AZ) pairs the bulk response
+        missed fall back to a per-group query. On-demand instances use
+        get_instance_price, which doesn't involve any API calls.
         """
+        spot_groups = defaultdict(list)
+        on_demand_instances = []
         for asg_meta in self.asg_metas:
             asg_instance_info = asg_meta.get_instance_info()
             if not asg_instance_info:
                 logger.info("Instance info not populated!")
                 continue
 
-            for instance_id, instance in asg_instance_info.iteritems():
-                price_data = self.get_instance_price(instance)
-                if instance_id in self.price_info:
-                    self.price_info[instance.InstanceId].append(price_data)
+            for instance_id, instance in asg_instance_info.items():
+                if 'InstanceLifecycle' not in instance:
+                    on_demand_instances.append(instance)
                 else:
-                    price_value_queue = deque(maxlen=24)
-                    self.price_info[instance.InstanceId] = price_value_queue
-                    price_value_queue.append(price_data)
+                    spot_groups[(instance.InstanceType,
+                                 instance.Placement.AvailabilityZone)]. \
+                        append(instance)
+
+        spot_prices = {}
+        if spot_groups:
+            try:
+                spot_prices = self.get_all_spot_prices(
+                    set(key[0] for key in spot_groups))
+            except Exception as exc:
+                logger.error("Failed bulk spot-price query, falling back " +
+                             "to per-group queries: " + str(exc))
+
+        pending = []
+        for (instance_type, zone), instances in spot_groups.items():
+            price = spot_prices.get((instance_type, zone))
+            if price is not None:
+                for instance in instances:
+                    self.record_price(instance.InstanceId, price)
+                continue
+            future = self._price_executor.submit(
+                self.get_group_spot_price, instance_type, zone)
+            pending.append((future, instance_type, zone, instances))
+
+        for future, instance_type, zone, instances in pending:
+            try:
+                price = future.result()
+            except Exception as exc:
+                logger.error("Failed to get spot price for %s in %s: %s",
+                             instance_type, zone, str(exc))
+                continue
+            for instance in instances:
+                self.record_price(instance.InstanceId, price)
+
+        for instance in on_demand_instances:
+            price = self.get_instance_price(instance)
+            if price is not None:
+                self.record_price(instance.InstanceId, price)
 
     def price_reporter_main(self):
         """ Periodically updates the pricing info. """
-        while True:
+        while not self._stop.is_set():
             try:
-                # Price check is done every 20 minutes.
+                # Price check is done every 60 minutes. If the ASGs
+                # haven't been populated yet, fall through to the wait
+                # below and check again next cycle.
                 if len(self.asg_metas) == 0:
                     logger.info("ASGs not set")
-                    continue
-                self.price_reporter_work()
+                else:
+                    self.price_reporter_work()
             except Exception as exc:
                 # Log an error and swallow the exception.
                 logger.error("Failed while getting instance pricing " +
                              "information: " + str(exc))
-            finally:
-                time.sleep(60 * SECONDS_PER_MINUTE)
+            self._stop.wait(60 * SECONDS_PER_MINUTE)
+
+    def stop(self):
+        """ Signals the collector thread to exit. """
+        self._stop.set()
+
+    def _build_app(self):
+        """ Builds the Flask app that serves the price-info endpoint. """
+        # Imported here so merely importing this module (e.g. from the
+        # CLI's argparse path) doesn't pull in Flask and Werkzeug.
+        from flask import Flask, Response
 
-    def price_reporter_api(self):
-        """ Thread that responds to the Flask api endpoints. """
         app = Flask("AWSPriceReporterAPI")
+        # The payload is machine-read; don't pay for key sorting or
+        # pretty-printing.
+        app.config['JSON_SORT_KEYS'] = False
+        app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 
         @app.route('/')
         def _return_price_info():
-            """ Returns a json comprising the price-information. """
+            """ Streams a json comprising the price-information. """
             try:
-                output = {}
-                for instance, values in self.price_info.iteritems():
-                    output[instance] = list(values)
-                return jsonify(output)
+                # Snapshot under the lock so the collector thread can
+                # keep appending while the response is being streamed.
+                with self._price_lock:
+                    snapshot = [(instance, self.ring_to_pairs(ring))
+                                for instance, ring
+                                in self.price_info.items()]
             except Exception as exc:
                 logger.info("Failed while reporting price info: " + str(exc))
+                snapshot = []
+
+            def generate():
+                """ Yields one instance's price record at a time. """
+                yield '{'
+                first = True
+                for instance, values in snapshot:
+                    encoded = _json.dumps(values)
+                    if isinstance(encoded, bytes):
+                        encoded = encoded.decode('utf-8')
+                    prefix = '' if first else ','
+                    yield prefix + '"' + instance + '":' + encoded
+                    first = False
+                yield '}'
+
+            return Response(generate(), mimetype='application/json')
+
+        return app
+
+    def price_reporter_api(self):
+        """ Thread that serves the Flask api endpoints. """
+        from wsgiref.simple_server import make_server, WSGIServer
+        try:
+            from socketserver import ThreadingMixIn
+        except ImportError:
+            from SocketServer import ThreadingMixIn
+
+        # Werkzeug's development server (app.run) is single-threaded and
+        # meant for debugging; a small threading WSGI server handles the
+        # one endpoint with a deterministic thread per request.
+        class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+            daemon_threads = True
 
-        app.run(host='0.0.0.0')
+        server = make_server('0.0.0.0', 5000, self.app,
+                             server_class=_ThreadingWSGIServer)
+        server.serve_forever()
 
     def run(self):
         """ Main method of the price-updater. """
@@ -6,8 +6,6 @@ import argparse
 import sys
 import logging
 
-from cloud_broker import Broker
-
 logger = logging.getLogger("minion_manager")
 logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s " +
                     "%(threadName)s: %(message)s",
@@ -40,6 +38,9 @@ def run():
                 usr_args.cloud)
 
     if usr_args.cloud == "aws":
+        # Imported here so argparse failures and --help don't pay for
+        # the Broker's transitive boto3/Flask/kubernetes imports.
+        from cloud_broker import Broker
         minion_manager = Broker.get_impl_object(
             usr_args.cloud, usr_args.cluster_name, usr_args.region, int(usr_args.refresh_interval_seconds),
             aws_profile=usr_args.profile, events_only=usr_args.events_only)